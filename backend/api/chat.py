@@ -3,18 +3,23 @@ Chat endpoints for DocBot Platform
 Handles conversational interactions with the RAG-powered chatbot
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 import uuid
+import json
 from datetime import datetime
 
-from models.database import get_db
+from models.database import get_db, AsyncSessionLocal
 from models.conversation import Conversation, Message
 from rag.engine import RAGEngine
+from rag.executor import ExecutorOverloaded
 from chat.conversation_manager import ConversationManager
+from chat.persistence import MessageWriteQueue
+from chat.history_cache import HistoryCache
 
 router = APIRouter()
 
@@ -28,6 +33,18 @@ def get_rag_dependency():
     return rag_engine
 
 
+def get_message_queue_dependency():
+    """Get the write-behind message queue from main module at runtime (None when disabled)"""
+    from main import message_queue
+    return message_queue
+
+
+def get_history_cache_dependency():
+    """Get the session history cache from main module at runtime (None when disabled)"""
+    from main import history_cache
+    return history_cache
+
+
 # Request/Response Models
 class ChatRequest(BaseModel):
     """Chat request from user"""
@@ -68,18 +85,22 @@ class ChatResponse(BaseModel):
 
 
 class SessionHistoryResponse(BaseModel):
-    """Conversation history for a session"""
+    """Conversation history for a session (one page)"""
     session_id: str
     messages: List[Dict[str, Any]]
     created_at: datetime
     updated_at: datetime
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+    has_more: bool = Field(False, description="Whether more messages exist beyond this page")
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
     db: AsyncSession = Depends(get_db),
-    rag_engine: RAGEngine = Depends(get_rag_dependency)
+    rag_engine: RAGEngine = Depends(get_rag_dependency),
+    message_queue: Optional[MessageWriteQueue] = Depends(get_message_queue_dependency),
+    history_cache: Optional[HistoryCache] = Depends(get_history_cache_dependency)
 ):
     """
     Main chat endpoint
@@ -95,11 +116,13 @@ async def chat(
         conversation_manager = ConversationManager(
             db=db,
             rag_engine=rag_engine,
-            session_id=session_id
+            session_id=session_id,
+            message_queue=message_queue,
+            history_cache=history_cache
         )
         
-        # Get or create conversation session
-        await conversation_manager.get_or_create_session()
+        # Load conversation and recent history in one round trip
+        await conversation_manager.load_session()
         
         # Process the user's message
         response_data = await conversation_manager.process_message(
@@ -124,27 +147,117 @@ async def chat(
             suggestions=response_data.get("suggestions")
         )
         
+    except ExecutorOverloaded as e:
+        logger.warning(f"Chat request rejected under load: {e}")
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
     except Exception as e:
         logger.error(f"Chat endpoint error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process chat: {str(e)}")
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    rag_engine: RAGEngine = Depends(get_rag_dependency),
+    message_queue: Optional[MessageWriteQueue] = Depends(get_message_queue_dependency),
+    history_cache: Optional[HistoryCache] = Depends(get_history_cache_dependency)
+):
+    """
+    Streaming chat endpoint
+    Sends the response as server-sent events: session, sources, token (repeated),
+    suggestions, visualization (optional), then done. The exchange is persisted
+    once the stream completes.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    logger.info(f"Chat stream request - Session: {session_id}, Mode: {request.mode}, Message: {request.message[:50]}...")
+    
+    async def event_stream():
+        # The session lives inside the generator because the response outlives the endpoint call
+        async with AsyncSessionLocal() as db:
+            try:
+                conversation_manager = ConversationManager(
+                    db=db,
+                    rag_engine=rag_engine,
+                    session_id=session_id,
+                    message_queue=message_queue,
+                    history_cache=history_cache
+                )
+                await conversation_manager.load_session()
+                
+                yield _sse_event("session", {"session_id": session_id})
+                
+                response_parts = []
+                async for event, data in conversation_manager.stream_message(
+                    user_message=request.message,
+                    mode=request.mode,
+                    module=request.module
+                ):
+                    if event == "token":
+                        response_parts.append(data["text"])
+                    yield _sse_event(event, data)
+                
+                await conversation_manager.save_messages(
+                    user_message=request.message,
+                    bot_response="".join(response_parts)
+                )
+                
+                logger.info(f"Chat stream completed - Session: {session_id}")
+                yield _sse_event("done", {"session_id": session_id, "timestamp": datetime.utcnow()})
+                
+            except ExecutorOverloaded as e:
+                logger.warning(f"Chat stream rejected under load: {e}")
+                await db.rollback()
+                yield _sse_event("error", {"status": 503, "detail": "Server is busy, please retry shortly"})
+            except Exception as e:
+                logger.error(f"Chat stream error: {e}")
+                await db.rollback()
+                yield _sse_event("error", {"status": 500, "detail": f"Failed to process chat: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.get("/chat/history/{session_id}", response_model=SessionHistoryResponse)
 async def get_chat_history(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(100, ge=1, le=500, description="Maximum messages per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    direction: str = Query("forward", pattern="^(forward|backward)$", description="forward: oldest first, backward: newest first"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json page or streamed NDJSON"),
+    db: AsyncSession = Depends(get_db),
+    message_queue: Optional[MessageWriteQueue] = Depends(get_message_queue_dependency)
 ):
     """
     Retrieve conversation history for a session
+    Keyset-paginated on (timestamp, id); format=ndjson streams the page line by line
     """
+    if format == "ndjson":
+        return await _stream_chat_history(session_id, limit, cursor, direction, message_queue)
+    
     try:
         conversation_manager = ConversationManager(
             db=db,
             rag_engine=None,  # Not needed for history retrieval
-            session_id=session_id
+            session_id=session_id,
+            message_queue=message_queue
         )
         
-        history = await conversation_manager.get_conversation_history()
+        history = await conversation_manager.get_conversation_history(
+            limit=limit,
+            cursor=cursor,
+            direction=direction
+        )
         
         if not history:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -153,15 +266,59 @@ async def get_chat_history(
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving chat history: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve history: {str(e)}")
 
 
+async def _stream_chat_history(
+    session_id: str,
+    limit: int,
+    cursor: Optional[str],
+    direction: str,
+    message_queue: Optional[MessageWriteQueue] = None
+) -> StreamingResponse:
+    """Stream a history page as NDJSON (one JSON object per line)"""
+    if cursor:
+        try:
+            ConversationManager.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    db = AsyncSessionLocal()
+    try:
+        conversation_manager = ConversationManager(
+            db=db, rag_engine=None, session_id=session_id, message_queue=message_queue
+        )
+        found = await conversation_manager.load_conversation()
+    except BaseException:
+        await db.close()
+        raise
+    if not found:
+        await db.close()
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    async def lines():
+        # The session lives with the stream because the response outlives the endpoint call
+        try:
+            async for record in conversation_manager.stream_conversation_history(limit, cursor, direction):
+                yield json.dumps(record, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming chat history: {e}")
+            yield json.dumps({"type": "error", "detail": f"Failed to retrieve history: {str(e)}"}) + "\n"
+        finally:
+            await db.close()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.delete("/chat/session/{session_id}")
 async def delete_session(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    history_cache: Optional[HistoryCache] = Depends(get_history_cache_dependency)
 ):
     """
     Delete a conversation session and its history
@@ -170,7 +327,8 @@ async def delete_session(
         conversation_manager = ConversationManager(
             db=db,
             rag_engine=None,
-            session_id=session_id
+            session_id=session_id,
+            history_cache=history_cache
         )
         
         deleted = await conversation_manager.delete_session()
@@ -192,9 +350,9 @@ async def delete_session(
 
 
 @router.get("/chat/modes")
-async def get_available_modes():
+async def get_available_modes(rag_engine: RAGEngine = Depends(get_rag_dependency)):
     """
-    Get available conversation modes and modules
+    Get available conversation modes and the client's configured modules
     """
     return {
         "modes": [
@@ -215,10 +373,5 @@ async def get_available_modes():
                 "description": "Ask any question about the platform"
             }
         ],
-        "modules": [
-            "Digital Twin",
-            "RF Prediction",
-            "UE Tracks",
-            "Orchestration"
-        ]
+        "modules": rag_engine.module_tagger.names()
     }
\ No newline at end of file
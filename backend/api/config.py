@@ -0,0 +1,34 @@
+"""
+Client configuration endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from loguru import logger
+
+from rag.engine import RAGEngine
+
+router = APIRouter()
+
+
+def get_rag_dependency():
+    """Get RAG engine from main module at runtime"""
+    from main import rag_engine
+    if rag_engine is None:
+        raise HTTPException(status_code=503, detail="RAG engine not initialized")
+    return rag_engine
+
+
+@router.post("/config/reload")
+async def reload_config(rag_engine: RAGEngine = Depends(get_rag_dependency)):
+    """
+    Reload the client configuration
+    Rebuilds system prompts, corpus selection and module tagging, and drops cached answers
+    """
+    rag_engine.reload_config()
+    logger.info(f"Reloaded config for {rag_engine.client} (version {rag_engine.config_version})")
+    return {
+        "client": rag_engine.client,
+        "config_version": rag_engine.config_version,
+        "modes": list(rag_engine.system_prompts),
+        "modules": rag_engine.module_tagger.names()
+    }
@@ -4,7 +4,7 @@ Health check endpoints
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from models.database import get_db
+from models.database import get_db, pool_metrics
 from loguru import logger
 import os
 
@@ -47,6 +47,54 @@ async def database_health_check(db: AsyncSession = Depends(get_db)):
         }
 
 
+@router.get("/health/db/pool")
+async def database_pool_metrics():
+    """
+    Database connection pool metrics
+    Reports checkout latency and pool saturation
+    """
+    return pool_metrics.snapshot()
+
+
+@router.get("/health/db/queue")
+async def message_queue_metrics():
+    """
+    Write-behind message queue metrics
+    """
+    from main import message_queue
+    
+    if message_queue is None:
+        return {"enabled": False}
+    
+    return dict(message_queue.stats(), enabled=True)
+
+
+@router.get("/health/history-cache")
+async def history_cache_metrics():
+    """
+    Conversation history cache metrics
+    """
+    from main import history_cache
+    
+    if history_cache is None:
+        return {"enabled": False}
+    
+    return dict(history_cache.stats(), enabled=True)
+
+
+@router.get("/health/db/retention")
+async def retention_job_metrics():
+    """
+    Message partition and retention job status
+    """
+    from main import retention_job
+    
+    if retention_job is None:
+        return {"enabled": False}
+    
+    return dict(retention_job.stats(), enabled=True)
+
+
 @router.get("/health/rag")
 async def rag_health_check():
     """
@@ -67,7 +115,16 @@ async def rag_health_check():
             "status": "healthy",
             "rag_engine": "initialized",
             "documents_loaded": doc_count,
-            "client": rag_engine.client
+            "client": rag_engine.client,
+            "retrieval_executor": rag_engine.retrieval_executor.stats(),
+            "query_batching": rag_engine.query_embedder.stats() if rag_engine.query_embedder else None,
+            "query_cache": rag_engine.query_cache.stats(),
+            "lexical_index": rag_engine.lexical_index.stats() if rag_engine.hybrid_enabled else None,
+            "corpus_selection": rag_engine.corpus_selector.settings(),
+            "module_chunks": rag_engine.module_chunk_counts,
+            "reranker": rag_engine.reranker.stats() if rag_engine.reranker else None,
+            "llm_usage": rag_engine.llm_usage_stats(),
+            "response_cache": rag_engine.response_cache.stats() if rag_engine.response_cache else None
         }
     except Exception as e:
         logger.error(f"RAG health check failed: {e}")
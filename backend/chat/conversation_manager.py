@@ -3,14 +3,19 @@ Conversation Manager
 Handles conversation flow, context management, and orchestrates RAG + LLM
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, true, tuple_
 from loguru import logger
 from datetime import datetime
+import base64
+import json
 
 from models.conversation import Conversation, Message
 from rag.engine import RAGEngine
+from chat.persistence import MessageWriteQueue, build_turn, build_turns_statement
+from chat.history_cache import HistoryCache
+from rag.modules import module_slug
 
 
 class ConversationManager:
@@ -18,7 +23,14 @@ class ConversationManager:
     Manages conversation sessions and orchestrates RAG/LLM interactions
     """
     
-    def __init__(self, db: AsyncSession, rag_engine: Optional[RAGEngine], session_id: str):
+    def __init__(
+        self,
+        db: AsyncSession,
+        rag_engine: Optional[RAGEngine],
+        session_id: str,
+        message_queue: Optional[MessageWriteQueue] = None,
+        history_cache: Optional[HistoryCache] = None
+    ):
         """
         Initialize conversation manager
         
@@ -26,43 +38,89 @@ class ConversationManager:
             db: Database session
             rag_engine: RAG engine instance
             session_id: Unique session identifier
+            message_queue: Write-behind queue for messages (None writes synchronously)
+            history_cache: Cache of recent session history (None always queries)
         """
         self.db = db
         self.rag_engine = rag_engine
+        self.message_queue = message_queue
+        self.history_cache = history_cache
         self.session_id = session_id
         self.conversation = None
+        self.conversation_id = None
+        self.recent_history = None
+        self.turn_started_at = None
         
         logger.info(f"ConversationManager initialized for session: {session_id}")
     
-    async def get_or_create_session(self) -> Conversation:
+    async def load_session(self, history_limit: int = 10) -> List[Dict[str, str]]:
         """
-        Get existing conversation or create new one
+        Load the conversation and its recent history in a single query
+        
+        The conversation row itself is created lazily by save_messages, so a
+        new session costs no write until there is something to persist. The
+        read transaction is committed before returning, releasing the pooled
+        connection while the response is generated.
         
+        Args:
+            history_limit: Maximum number of recent messages to load
+            
         Returns:
-            Conversation object
+            List of message dicts with role and content, oldest first
         """
-        # Check if conversation exists
+        self.turn_started_at = datetime.utcnow()
+        
+        # Cached sessions skip the query entirely; save_messages keeps the cache current
+        cached = self.history_cache.get(self.session_id) if self.history_cache else None
+        if cached is not None:
+            self.conversation_id = cached["conversation_id"]
+            self.recent_history = cached["messages"][-history_limit:]
+            return self.recent_history
+        
+        # Snapshot queued writes before reading, so a turn committed in between is seen at least once
+        pending = self.message_queue.pending_messages(self.session_id) if self.message_queue else []
+        
+        recent = (
+            select(Message.id, Message.role, Message.content, Message.timestamp)
+            .where(Message.conversation_id == Conversation.id)
+            .order_by(Message.timestamp.desc())
+            .limit(history_limit)
+            .lateral("recent")
+        )
         result = await self.db.execute(
-            select(Conversation).where(Conversation.session_id == self.session_id)
+            select(Conversation.id, recent.c.id.label("message_id"), recent.c.role, recent.c.content, recent.c.timestamp)
+            .outerjoin(recent, true())
+            .where(Conversation.session_id == self.session_id)
         )
-        conversation = result.scalar_one_or_none()
+        rows = result.all()
+        # End the read transaction now so the connection goes back to the pool
+        # instead of idling in a transaction through generation; save_messages
+        # writes in a fresh, short transaction of its own
+        await self.db.commit()
         
-        if conversation:
+        if rows:
             logger.info(f"Found existing conversation: {self.session_id}")
-            self.conversation = conversation
+            self.conversation_id = rows[0].id
         else:
-            # Create new conversation
-            logger.info(f"Creating new conversation: {self.session_id}")
-            conversation = Conversation(
-                session_id=self.session_id,
-                client=self.rag_engine.client if self.rag_engine else "unknown"
-            )
-            self.db.add(conversation)
-            await self.db.commit()
-            await self.db.refresh(conversation)
-            self.conversation = conversation
+            logger.info(f"New conversation: {self.session_id}")
+            self.conversation_id = None
         
-        return self.conversation
+        messages = {
+            row.message_id: {"role": row.role, "content": row.content, "timestamp": row.timestamp}
+            for row in rows
+            if row.message_id is not None
+        }
+        for msg in pending:
+            messages.setdefault(msg["id"], msg)
+        
+        self.recent_history = [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in sorted(messages.values(), key=lambda msg: msg["timestamp"])
+        ][-history_limit:]
+        
+        if self.history_cache:
+            self.history_cache.put(self.session_id, self.conversation_id, self.recent_history)
+        return self.recent_history
     
     async def process_message(
         self,
@@ -86,16 +144,21 @@ class ConversationManager:
         # Get conversation history
         history = await self._get_message_history()
         
-        # Retrieve relevant context from RAG
-        context = await self.rag_engine.retrieve(user_message)
+        response_data = await self._lookup_cached_response(user_message, mode, module, history)
         
-        # Generate response
-        response_data = await self.rag_engine.generate_response(
-            query=user_message,
-            context=context,
-            conversation_history=history,
-            mode=mode
-        )
+        if response_data is None:
+            # Retrieve relevant context from RAG
+            context = await self.rag_engine.retrieve(user_message, module=module)
+            
+            # Generate response
+            response_data = await self.rag_engine.generate_response(
+                query=user_message,
+                context=context,
+                conversation_history=history,
+                mode=mode
+            )
+            
+            await self._store_cached_response(user_message, mode, module, history, response_data)
         
         # Add suggestions for follow-up questions
         suggestions = self._generate_suggestions(mode, module)
@@ -109,6 +172,124 @@ class ConversationManager:
         logger.info(f"Response generated for session: {self.session_id}")
         return response_data
     
+    async def stream_message(
+        self,
+        user_message: str,
+        mode: str = "full_overview",
+        module: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process user message and stream the response as it is generated
+        
+        Sources are emitted as soon as retrieval finishes, followed by the
+        response text deltas and finally suggestions and visualization.
+        
+        Args:
+            user_message: User's input message
+            mode: Conversation mode (full_overview, module_deep_dive, general)
+            module: Specific module if in deep-dive mode
+            
+        Yields:
+            Tuples of (event name, event data)
+        """
+        logger.info(f"Streaming message in mode '{mode}': {user_message[:50]}...")
+        
+        history = await self._get_message_history()
+        
+        cached = await self._lookup_cached_response(user_message, mode, module, history)
+        if cached:
+            yield "sources", {"sources": cached["sources"]}
+            yield "token", {"text": cached["response"]}
+        else:
+            context = await self.rag_engine.retrieve(user_message, module=module)
+            # Assemble first so sources only list the chunks that fit the token budget
+            prompt = self.rag_engine.build_prompt(user_message, context, history, mode)
+            sources = self.rag_engine.format_sources(prompt["context"])
+            
+            yield "sources", {"sources": sources}
+            
+            response_parts = []
+            async for text in self.rag_engine.stream_response(
+                query=user_message,
+                context=context,
+                conversation_history=history,
+                mode=mode,
+                prompt=prompt
+            ):
+                response_parts.append(text)
+                yield "token", {"text": text}
+            
+            await self._store_cached_response(user_message, mode, module, history, {
+                "response": "".join(response_parts),
+                "sources": sources,
+                "mode": mode
+            })
+        
+        yield "suggestions", {"suggestions": self._generate_suggestions(mode, module)}
+        
+        visualization = await self._generate_visualization(user_message, mode)
+        if visualization:
+            yield "visualization", {"visualization": visualization}
+        
+        logger.info(f"Streamed response for session: {self.session_id}")
+    
+    async def _lookup_cached_response(
+        self,
+        user_message: str,
+        mode: str,
+        module: Optional[str],
+        history: List[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a semantically cached answer for the message
+        
+        Only the opening turn of a conversation is served from cache, since a
+        follow-up such as "Show me a code example" depends on the earlier turns.
+        
+        Args:
+            user_message: User's input message
+            mode: Conversation mode
+            module: Specific module if in deep-dive mode
+            history: Conversation history
+            
+        Returns:
+            Cached response data or None
+        """
+        cache = self.rag_engine.response_cache
+        if cache is None or history:
+            return None
+        
+        query_embedding = await self.rag_engine.embed_query(user_message)
+        cached = cache.lookup(query_embedding, mode, module, self.rag_engine.response_cache_version)
+        if cached:
+            logger.info(f"Response cache hit (similarity {cached['cache']['similarity']}) for session: {self.session_id}")
+        return cached
+    
+    async def _store_cached_response(
+        self,
+        user_message: str,
+        mode: str,
+        module: Optional[str],
+        history: List[Dict[str, str]],
+        response_data: Dict[str, Any]
+    ):
+        """
+        Store a freshly generated opening-turn answer in the semantic cache
+        
+        Args:
+            user_message: User's input message
+            mode: Conversation mode
+            module: Specific module if in deep-dive mode
+            history: Conversation history
+            response_data: Generated response data
+        """
+        cache = self.rag_engine.response_cache
+        if cache is None or history:
+            return
+        
+        query_embedding = await self.rag_engine.embed_query(user_message)
+        cache.store(query_embedding, mode, module, self.rag_engine.response_cache_version, response_data)
+    
     async def _get_message_history(self, limit: int = 10) -> List[Dict[str, str]]:
         """
         Get conversation message history
@@ -119,12 +300,16 @@ class ConversationManager:
         Returns:
             List of message dicts with role and content
         """
-        if not self.conversation:
+        # History already loaded with the session by load_session
+        if self.recent_history is not None:
+            return self.recent_history[-limit:]
+        
+        if not self.conversation_id:
             return []
         
         result = await self.db.execute(
             select(Message)
-            .where(Message.conversation_id == self.conversation.id)
+            .where(Message.conversation_id == self.conversation_id)
             .order_by(Message.timestamp.desc())
             .limit(limit)
         )
@@ -158,28 +343,30 @@ class ConversationManager:
                 "Can you visualize this workflow?"
             ]
         elif mode == "module_deep_dive":
-            if module == "Digital Twin":
+            # Configured names vary per client ("Digital Twin Training", "Simulation Orchestration")
+            module_key = module_slug(module or "")
+            if "digital_twin" in module_key:
                 suggestions = [
                     "How do I tune the training parameters?",
                     "What data format is required?",
                     "Show me a training example",
                     "What happens if training fails?"
                 ]
-            elif module == "RF Prediction":
+            elif "rf_prediction" in module_key:
                 suggestions = [
                     "How accurate are the predictions?",
                     "Can I adjust antenna parameters?",
                     "Show me prediction output format",
                     "How long does prediction take?"
                 ]
-            elif module == "UE Tracks":
+            elif "ue_tracks" in module_key:
                 suggestions = [
                     "How do I generate custom UE paths?",
                     "What's the difference between UE classes?",
                     "Show me UE data format",
                     "Can I upload my own UE data?"
                 ]
-            elif module == "Orchestration":
+            elif "orchestration" in module_key:
                 suggestions = [
                     "How are jobs scheduled?",
                     "What happens if a job fails?",
@@ -280,77 +467,224 @@ class ConversationManager:
         """
         Save user and bot messages to database
         
+        With a write-behind queue the exchange is queued and this returns
+        immediately. Otherwise the conversation upsert and both message rows go
+        out as one statement followed by one commit.
+        
         Args:
             user_message: User's message
             bot_response: Bot's response
         """
-        if not self.conversation:
-            logger.warning("No conversation found, cannot save messages")
-            return
-        
-        # Save user message
-        user_msg = Message(
-            conversation_id=self.conversation.id,
-            role="user",
-            content=user_message
+        turn = build_turn(
+            session_id=self.session_id,
+            client=self.rag_engine.client if self.rag_engine else "unknown",
+            user_message=user_message,
+            bot_response=bot_response,
+            user_timestamp=self.turn_started_at
         )
-        self.db.add(user_msg)
         
-        # Save bot message
-        bot_msg = Message(
-            conversation_id=self.conversation.id,
-            role="assistant",
-            content=bot_response
-        )
-        self.db.add(bot_msg)
+        if self.message_queue:
+            await self.message_queue.enqueue(turn)
+            logger.info(f"Messages queued for session: {self.session_id}")
+        else:
+            result = await self.db.execute(build_turns_statement([turn]))
+            self.conversation_id = result.scalars().first()
+            await self.db.commit()
+            logger.info(f"Messages saved for session: {self.session_id}")
         
-        # Update conversation timestamp
-        self.conversation.updated_at = datetime.utcnow()
+        new_messages = [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": bot_response}
+        ]
+        if self.recent_history is not None:
+            self.recent_history.extend(new_messages)
+        if self.history_cache:
+            self.history_cache.append(self.session_id, self.conversation_id, new_messages)
+    
+    @staticmethod
+    def encode_cursor(timestamp: datetime, message_id: str) -> str:
+        """
+        Encode a history pagination cursor
         
-        await self.db.commit()
-        logger.info(f"Messages saved for session: {self.session_id}")
+        Args:
+            timestamp: Timestamp of the boundary message
+            message_id: ID of the boundary message
+            
+        Returns:
+            Opaque URL-safe cursor
+        """
+        raw = json.dumps([timestamp.isoformat(), message_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
     
-    async def get_conversation_history(self) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, str]:
         """
-        Get full conversation history
+        Decode a history pagination cursor
         
+        Args:
+            cursor: Cursor from a previous page
+            
         Returns:
-            Dict with conversation metadata and messages
+            Tuple of (timestamp, message id)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            timestamp, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return datetime.fromisoformat(timestamp), str(message_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    async def load_conversation(self) -> Optional[Conversation]:
+        """
+        Load the conversation row for this session
+        
+        With write-behind enabled, the session's queued turns are flushed first
+        so history reads see the session's own writes (including the
+        conversation row of a brand-new session).
         """
         if not self.conversation:
-            # Try to load conversation
+            if self.message_queue:
+                await self.message_queue.wait_for_session(self.session_id)
             result = await self.db.execute(
                 select(Conversation).where(Conversation.session_id == self.session_id)
             )
             self.conversation = result.scalar_one_or_none()
+        return self.conversation
+    
+    def _history_page_query(self, limit: int, cursor: Optional[str], direction: str):
+        """
+        Build a keyset-paginated message query on (timestamp, id)
         
-        if not self.conversation:
+        Args:
+            limit: Number of rows to select
+            cursor: Cursor of the last message already seen, if any
+            direction: "forward" (oldest first) or "backward" (newest first)
+            
+        Returns:
+            Select statement for Message rows
+        """
+        backward = direction == "backward"
+        key = tuple_(Message.timestamp, Message.id)
+        query = select(Message).where(Message.conversation_id == self.conversation.id)
+        
+        if cursor:
+            boundary = self.decode_cursor(cursor)
+            query = query.where(key < boundary if backward else key > boundary)
+        
+        if backward:
+            query = query.order_by(Message.timestamp.desc(), Message.id.desc())
+        else:
+            query = query.order_by(Message.timestamp.asc(), Message.id.asc())
+        
+        return query.limit(limit)
+    
+    @staticmethod
+    def _serialize_message(msg: Message) -> Dict[str, Any]:
+        """Convert a Message row into its API representation"""
+        return {
+            "id": msg.id,
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.timestamp,
+            "sources": msg.sources,
+            "visualization": msg.visualization
+        }
+    
+    async def get_conversation_history(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        direction: str = "forward"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get one page of conversation history
+        
+        Pages are always returned in chronological order. With direction
+        "backward" the first page holds the newest messages and next_cursor
+        pages further into the past.
+        
+        Args:
+            limit: Maximum number of messages in the page
+            cursor: Cursor from a previous page
+            direction: "forward" (oldest first) or "backward" (newest first)
+            
+        Returns:
+            Dict with conversation metadata, messages and next_cursor, or None
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        if not await self.load_conversation():
             return None
         
-        # Get all messages
-        result = await self.db.execute(
-            select(Message)
-            .where(Message.conversation_id == self.conversation.id)
-            .order_by(Message.timestamp.asc())
-        )
+        # Fetch one extra row to learn whether another page exists
+        result = await self.db.execute(self._history_page_query(limit + 1, cursor, direction))
         messages = result.scalars().all()
         
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        next_cursor = self.encode_cursor(messages[-1].timestamp, messages[-1].id) if has_more else None
+        
+        if direction == "backward":
+            messages = list(reversed(messages))
+        
         return {
             "session_id": self.conversation.session_id,
             "created_at": self.conversation.created_at,
             "updated_at": self.conversation.updated_at,
-            "messages": [
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp,
-                    "sources": msg.sources,
-                    "visualization": msg.visualization
-                }
-                for msg in messages
-            ]
+            "messages": [self._serialize_message(msg) for msg in messages],
+            "next_cursor": next_cursor,
+            "has_more": has_more
         }
     
+    async def stream_conversation_history(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        direction: str = "forward"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream conversation history row by row from a server-side cursor
+        
+        Yields a header record, one record per message in the requested
+        direction, and a trailer carrying next_cursor.
+        
+        Args:
+            limit: Maximum number of messages to stream
+            cursor: Cursor from a previous page
+            direction: "forward" (oldest first) or "backward" (newest first)
+            
+        Yields:
+            Dicts of the form {"type": "session" | "message" | "end", ...}
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = self._history_page_query(limit + 1, cursor, direction)
+        
+        yield {
+            "type": "session",
+            "session_id": self.conversation.session_id,
+            "created_at": self.conversation.created_at,
+            "updated_at": self.conversation.updated_at
+        }
+        
+        count = 0
+        last = None
+        result = await self.db.stream(query)
+        async for msg in result.scalars():
+            if count == limit:
+                yield {"type": "end", "next_cursor": self.encode_cursor(last.timestamp, last.id), "has_more": True}
+                await result.close()
+                return
+            yield dict(self._serialize_message(msg), type="message")
+            last = msg
+            count += 1
+        
+        yield {"type": "end", "next_cursor": None, "has_more": False}
+    
     async def delete_session(self) -> bool:
         """
         Delete conversation session
@@ -358,17 +692,25 @@ class ConversationManager:
         Returns:
             True if deleted, False if not found
         """
-        if not self.conversation:
-            result = await self.db.execute(
-                select(Conversation).where(Conversation.session_id == self.session_id)
-            )
-            self.conversation = result.scalar_one_or_none()
+        # Queued turns would recreate the conversation when flushed after the delete
+        if self.message_queue:
+            await self.message_queue.wait_for_session(self.session_id)
         
-        if not self.conversation:
+        # Set-based delete; messages go with it through ON DELETE CASCADE
+        # instead of being loaded and deleted one by one by the ORM
+        result = await self.db.execute(
+            delete(Conversation).where(Conversation.session_id == self.session_id)
+        )
+        await self.db.commit()
+        
+        if result.rowcount == 0:
             return False
         
-        await self.db.delete(self.conversation)
-        await self.db.commit()
+        self.conversation = None
+        self.conversation_id = None
+        
+        if self.history_cache:
+            self.history_cache.invalidate(self.session_id)
         
         logger.info(f"Deleted conversation session: {self.session_id}")
         return True
\ No newline at end of file
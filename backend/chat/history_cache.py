@@ -0,0 +1,117 @@
+"""
+Conversation history cache
+Keeps the recent messages of active sessions in memory so follow-up turns skip the history query
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+
+from rag.cache import LRUCache
+
+
+class HistoryCache(ABC):
+    """
+    Interface for per-session history caches
+
+    Implementations hold the conversation ID and the most recent messages of a
+    session. The in-process implementation below only suits a single worker:
+    with several workers each cache misses turns appended and deletions made by
+    the others, so it is opt-in (HISTORY_CACHE_ENABLED). A shared backend
+    (e.g. Redis) can implement the same methods for multi-worker deployments.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get cached {"conversation_id", "messages"} for a session, or None"""
+
+    @abstractmethod
+    def put(self, session_id: str, conversation_id: Optional[str], messages: List[Dict[str, str]]):
+        """Store the recent history of a session"""
+
+    @abstractmethod
+    def append(self, session_id: str, conversation_id: Optional[str], messages: List[Dict[str, str]]):
+        """Append new messages to a cached session (no-op if not cached)"""
+
+    @abstractmethod
+    def invalidate(self, session_id: str):
+        """Drop a session from the cache"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+
+
+class InMemoryHistoryCache(HistoryCache):
+    """
+    In-process history cache bounded by session count, with idle eviction
+
+    Only consistent with a single worker process (see HistoryCache).
+    """
+
+    def __init__(self, max_sessions: int = 10000, max_messages: int = 10, idle_ttl_seconds: float = 1800):
+        """
+        Initialize cache
+
+        Args:
+            max_sessions: Maximum number of cached sessions (least recently used are evicted)
+            max_messages: Messages kept per session
+            idle_ttl_seconds: Sessions untouched for this long are evicted
+        """
+        self.max_messages = max(1, max_messages)
+        self._cache = LRUCache(max_size=max_sessions, ttl_seconds=idle_ttl_seconds, sliding=True)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached history of a session
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Copy of {"conversation_id", "messages"}, or None if not cached
+        """
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+        return {"conversation_id": entry["conversation_id"], "messages": list(entry["messages"])}
+
+    def put(self, session_id: str, conversation_id: Optional[str], messages: List[Dict[str, str]]):
+        """
+        Store the recent history of a session, keeping the last max_messages
+
+        Args:
+            session_id: Session identifier
+            conversation_id: Conversation ID (None before the first write)
+            messages: Messages, oldest first
+        """
+        self._cache.set(session_id, {
+            "conversation_id": conversation_id,
+            "messages": list(messages)[-self.max_messages:]
+        })
+
+    def append(self, session_id: str, conversation_id: Optional[str], messages: List[Dict[str, str]]):
+        """
+        Append new messages to a cached session (no-op if not cached)
+
+        Args:
+            session_id: Session identifier
+            conversation_id: Conversation ID, replacing the cached one when set
+            messages: New messages, oldest first
+        """
+        entry = self._cache.peek(session_id)
+        if entry is None:
+            return
+        self.put(session_id, conversation_id or entry["conversation_id"], entry["messages"] + list(messages))
+
+    def invalidate(self, session_id: str):
+        """
+        Drop a session from the cache
+
+        Args:
+            session_id: Session identifier
+        """
+        self._cache.pop(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return dict(self._cache.stats(), max_messages=self.max_messages)
@@ -0,0 +1,296 @@
+"""
+Message persistence
+Batched conversation/message writes and the write-behind queue that takes them off the response path
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy import select, insert, values, column, String, Text, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from loguru import logger
+
+from models.database import AsyncSessionLocal
+from models.conversation import Conversation, Message, generate_uuid
+
+
+def build_turn(
+    session_id: str,
+    client: str,
+    user_message: str,
+    bot_response: str,
+    user_timestamp: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Build the record for one user/assistant exchange
+
+    Args:
+        session_id: Session identifier
+        client: Client name for a newly created conversation
+        user_message: User's message
+        bot_response: Bot's response
+        user_timestamp: When the user message was received (default: now)
+
+    Returns:
+        Turn dict consumed by build_turns_statement
+    """
+    now = datetime.utcnow()
+    return {
+        "session_id": session_id,
+        "client": client,
+        "updated_at": now,
+        "messages": [
+            {"id": generate_uuid(), "role": "user", "content": user_message, "timestamp": user_timestamp or now},
+            {"id": generate_uuid(), "role": "assistant", "content": bot_response, "timestamp": now}
+        ]
+    }
+
+
+def build_turns_statement(turns: List[Dict[str, Any]]):
+    """
+    Build a single statement persisting any number of turns
+
+    Conversations are upserted with INSERT ... ON CONFLICT (session_id) in a
+    data-modifying CTE that feeds an INSERT ... SELECT of every message row.
+
+    Args:
+        turns: Turn dicts from build_turn
+
+    Returns:
+        Executable insert statement returning the conversation_id of each message row
+    """
+    # One row per session: ON CONFLICT cannot touch the same row twice in a statement
+    conversations: Dict[str, Dict[str, Any]] = {}
+    for turn in turns:
+        row = conversations.setdefault(turn["session_id"], {
+            "id": generate_uuid(),
+            "session_id": turn["session_id"],
+            "client": turn["client"],
+            "created_at": turn["updated_at"],
+            "updated_at": turn["updated_at"]
+        })
+        row["updated_at"] = max(row["updated_at"], turn["updated_at"])
+
+    upsert = pg_insert(Conversation).values(list(conversations.values()))
+    conversation = (
+        upsert
+        .on_conflict_do_update(
+            index_elements=[Conversation.session_id],
+            set_={"updated_at": upsert.excluded.updated_at}
+        )
+        .returning(Conversation.id, Conversation.session_id)
+        .cte("conversation")
+    )
+
+    new_messages = values(
+        column("id", String),
+        column("session_id", String),
+        column("role", String),
+        column("content", Text),
+        column("timestamp", DateTime),
+        name="new_messages"
+    ).data([
+        (msg["id"], turn["session_id"], msg["role"], msg["content"], msg["timestamp"])
+        for turn in turns
+        for msg in turn["messages"]
+    ])
+
+    return (
+        insert(Message)
+        .from_select(
+            ["id", "conversation_id", "role", "content", "timestamp"],
+            select(
+                new_messages.c.id,
+                conversation.c.id,
+                new_messages.c.role,
+                new_messages.c.content,
+                new_messages.c.timestamp
+            ).select_from(conversation).join(
+                new_messages, new_messages.c.session_id == conversation.c.session_id
+            )
+        )
+        .add_cte(conversation)
+        .returning(Message.conversation_id)
+    )
+
+
+class MessageWriteQueue:
+    """
+    Write-behind queue for conversation turns
+
+    Turns are flushed in batches when batch_size turns are waiting or the flush
+    interval elapses. A full queue blocks producers (backpressure). Until a turn
+    is committed it is kept in a per-session pending list so the session's next
+    history read still sees its own writes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        batch_size: int = 100,
+        flush_interval_ms: float = 200,
+        max_retries: int = 3,
+        wait_timeout_seconds: float = 10
+    ):
+        """
+        Initialize queue
+
+        Args:
+            max_size: Maximum number of queued turns before producers block
+            batch_size: Maximum turns written per flush
+            flush_interval_ms: Maximum time a turn waits for its batch to fill
+            max_retries: Attempts per batch before it is dropped
+            wait_timeout_seconds: Default limit for wait_for_session
+        """
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.max_retries = max(1, max_retries)
+        self.wait_timeout = max(0.0, wait_timeout_seconds)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_size))
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._flushed = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self.turns_written = 0
+        self.batches_written = 0
+        self.turns_dropped = 0
+
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Message write-behind queue started")
+
+    async def stop(self):
+        """Flush everything still queued and stop the background task"""
+        if self._task is None:
+            return
+        logger.info(f"Draining message write-behind queue ({self._queue.qsize()} turns pending)...")
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Message write-behind queue stopped")
+
+    async def enqueue(self, turn: Dict[str, Any]):
+        """
+        Queue a turn for persistence, waiting while the queue is full
+
+        Args:
+            turn: Turn dict from build_turn
+        """
+        # Registered only once queued: a put cancelled while the queue is full
+        # (e.g. the client disconnected) must not leave phantom pending messages
+        await self._queue.put(turn)
+        self._pending.setdefault(turn["session_id"], []).extend(turn["messages"])
+
+    def pending_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get messages of a session that are queued but not yet committed
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Copy of the pending message dicts, oldest first
+        """
+        return list(self._pending.get(session_id, []))
+
+    async def wait_for_session(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued turn of a session has been committed or dropped
+
+        Deleting a session must wait for this, otherwise a later flush upserts
+        the conversation again.
+
+        Args:
+            session_id: Session identifier
+            timeout: Maximum seconds to wait (default: wait_timeout)
+
+        Returns:
+            True if the session has no queued turns left, False on timeout
+        """
+        if self._task is None or session_id not in self._pending:
+            return True
+        try:
+            async with self._flushed:
+                await asyncio.wait_for(
+                    self._flushed.wait_for(lambda: session_id not in self._pending),
+                    self.wait_timeout if timeout is None else timeout
+                )
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out waiting for queued turns of session {session_id}")
+            return False
+        return True
+
+    async def _run(self):
+        """Collect turns into batches and flush them"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            turn = await self._queue.get()
+            if turn is None:
+                break
+
+            batch = [turn]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    turn = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if turn is None:
+                    stopping = True
+                    break
+                batch.append(turn)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """
+        Write a batch of turns in one statement and one commit
+
+        Args:
+            batch: Turns to persist
+        """
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(build_turns_statement(batch))
+                    await session.commit()
+                self.turns_written += len(batch)
+                self.batches_written += 1
+                break
+            except Exception as e:
+                logger.error(f"Message flush failed (attempt {attempt}/{self.max_retries}, {len(batch)} turns): {e}")
+                if attempt == self.max_retries:
+                    self.turns_dropped += len(batch)
+                    sessions = sorted({turn["session_id"] for turn in batch})
+                    logger.error(f"Dropped {len(batch)} turns after {attempt} attempts, sessions: {', '.join(sessions)}")
+                else:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+
+        # Committed (or dropped) turns no longer need to be overlaid on history reads
+        for turn in batch:
+            written_ids = {msg["id"] for msg in turn["messages"]}
+            remaining = [
+                msg for msg in self._pending.get(turn["session_id"], [])
+                if msg["id"] not in written_ids
+            ]
+            if remaining:
+                self._pending[turn["session_id"]] = remaining
+            else:
+                self._pending.pop(turn["session_id"], None)
+        async with self._flushed:
+            self._flushed.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "sessions_pending": len(self._pending),
+            "turns_written": self.turns_written,
+            "batches_written": self.batches_written,
+            "turns_dropped": self.turns_dropped
+        }
@@ -0,0 +1,225 @@
+"""
+Conversation retention
+Background job that maintains monthly message partitions and archives or drops expired ones
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import text
+from loguru import logger
+
+from models.database import (
+    engine,
+    PARTITION_NAME,
+    add_months,
+    ensure_message_partitions,
+    check_message_partition_horizon,
+)
+
+# Arbitrary key for the advisory lock that lets one worker at a time run maintenance
+RETENTION_LOCK_ID = 815_420_002
+
+
+class RetentionJob:
+    """
+    Periodic partition maintenance for the messages table
+
+    Each run creates the partitions for upcoming months, then detaches every
+    monthly partition that lies entirely before the retention cutoff and either
+    moves it to the archive schema or drops it. Conversations left without any
+    message and idle past the cutoff are deleted in one statement.
+
+    Every worker runs the job, but a run only proceeds in the process holding
+    the retention advisory lock; the others skip it. Partitions are detached
+    CONCURRENTLY so chat traffic on messages is not blocked meanwhile.
+    """
+
+    def __init__(
+        self,
+        retention_days: int = 0,
+        archive_mode: str = "archive",
+        archive_schema: str = "archive",
+        interval_seconds: float = 3600,
+        months_ahead: int = 2
+    ):
+        """
+        Initialize job
+
+        Args:
+            retention_days: Days of messages to keep (0 keeps everything)
+            archive_mode: "archive" moves expired partitions to archive_schema, "drop" deletes them
+            archive_schema: Schema receiving archived partitions
+            interval_seconds: Time between runs
+            months_ahead: Future monthly partitions to keep created
+        """
+        if archive_mode not in ("archive", "drop"):
+            raise ValueError(f"Unknown archive mode: {archive_mode}")
+
+        self.retention_days = max(0, retention_days)
+        self.archive_mode = archive_mode
+        self.archive_schema = archive_schema
+        self.interval = max(60.0, interval_seconds)
+        self.months_ahead = max(1, months_ahead)
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        """Start the periodic background task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Retention job started (retention: {self.retention_days or 'unlimited'} days, "
+                f"mode: {self.archive_mode})"
+            )
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention job failed: {e}")
+            # Repeated failures must not let inserts run past the last partition unnoticed
+            try:
+                await check_message_partition_horizon()
+            except Exception as e:
+                logger.error(f"Message partition horizon check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Run partition maintenance once
+
+        Returns:
+            Report of created, archived and dropped partitions and deleted
+            conversations, or {"skipped": True} when another process is running it
+        """
+        # Session-level lock on its own connection, outside any transaction
+        async with engine.connect() as lock_conn:
+            lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await lock_conn.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": RETENTION_LOCK_ID}
+            )
+            if not result.scalar():
+                logger.debug("Retention run skipped, another process holds the lock")
+                return {"skipped": True}
+            try:
+                return await self._run_locked()
+            finally:
+                await lock_conn.execute(
+                    text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": RETENTION_LOCK_ID}
+                )
+
+    async def _run_locked(self) -> Dict[str, Any]:
+        """Run partition maintenance while holding the retention lock"""
+        today = datetime.utcnow().date()
+        report = {
+            "partitions_created": await ensure_message_partitions(self.months_ahead),
+            "partitions_archived": [],
+            "partitions_dropped": [],
+            "conversations_deleted": 0
+        }
+
+        if self.retention_days:
+            cutoff = today - timedelta(days=self.retention_days)
+            for name, detach_pending in await self._expired_partitions(cutoff):
+                await self._retire_partition(name, detach_pending)
+                report["partitions_archived" if self.archive_mode == "archive" else "partitions_dropped"].append(name)
+
+            async with engine.begin() as conn:
+                result = await conn.execute(
+                    text("""
+                        DELETE FROM conversations c
+                        WHERE c.updated_at < :cutoff
+                          AND NOT EXISTS (SELECT 1 FROM messages m WHERE m.conversation_id = c.id)
+                    """),
+                    {"cutoff": datetime.combine(cutoff, datetime.min.time())}
+                )
+                report["conversations_deleted"] = result.rowcount
+
+        if report["partitions_archived"] or report["partitions_dropped"] or report["conversations_deleted"]:
+            logger.info(f"Retention run: {report}")
+
+        self.last_run = dict(report, finished_at=datetime.utcnow().isoformat())
+        return report
+
+    async def _expired_partitions(self, cutoff: date) -> List[Tuple[str, bool]]:
+        """
+        List monthly partitions whose whole range ends on or before the cutoff
+
+        Args:
+            cutoff: Oldest date to keep
+
+        Returns:
+            (partition table name, detach pending) pairs, oldest first; a detach
+            is left pending when a concurrent detach was interrupted
+        """
+        async with engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT child.relname, pg_inherits.inhdetachpending
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = 'messages'
+            """))
+            partitions = [(row[0], row[1]) for row in result]
+
+        expired = []
+        for name, detach_pending in sorted(partitions):
+            match = PARTITION_NAME.match(name)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) <= cutoff:
+                expired.append((name, detach_pending))
+        return expired
+
+    async def _retire_partition(self, name: str, detach_pending: bool = False):
+        """
+        Detach a partition, then archive or drop it
+
+        Args:
+            name: Partition table name (validated against PARTITION_NAME)
+            detach_pending: Finish an interrupted concurrent detach instead of starting one
+        """
+        # A concurrent detach cannot run inside a transaction block
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            action = "FINALIZE" if detach_pending else "CONCURRENTLY"
+            await conn.execute(text(f"ALTER TABLE messages DETACH PARTITION {name} {action}"))
+
+        async with engine.begin() as conn:
+            if self.archive_mode == "drop":
+                await conn.execute(text(f"DROP TABLE {name}"))
+                return
+
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.archive_schema}"))
+            # Archived rows must not be cascade-deleted with their conversations
+            result = await conn.execute(
+                text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"),
+                {"table": name}
+            )
+            for (constraint,) in result.all():
+                await conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+            await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {self.archive_schema}"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get job configuration and the last run report"""
+        return {
+            "retention_days": self.retention_days,
+            "archive_mode": self.archive_mode,
+            "interval_seconds": self.interval,
+            "months_ahead": self.months_ahead,
+            "last_run": self.last_run
+        }
@@ -13,8 +13,12 @@ from loguru import logger
 
 from api.chat import router as chat_router
 from api.health import router as health_router
+from api.config import router as config_router
 from rag.engine import RAGEngine
 from models.database import init_db
+from chat.persistence import MessageWriteQueue
+from chat.history_cache import InMemoryHistoryCache
+from chat.retention import RetentionJob
 
 # Load environment variables
 load_dotenv()
@@ -29,10 +33,22 @@ CLIENT = os.getenv("CLIENT", "maveric")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+MESSAGE_WRITE_BEHIND = os.getenv("MESSAGE_WRITE_BEHIND", "False").lower() == "true"
+HISTORY_CACHE_ENABLED = os.getenv("HISTORY_CACHE_ENABLED", "False").lower() == "true"
+RETENTION_JOB_ENABLED = os.getenv("RETENTION_JOB_ENABLED", "True").lower() == "true"
 
 # Global RAG engine instance
 rag_engine = None
 
+# Global write-behind message queue (None when messages are written synchronously)
+message_queue = None
+
+# Global per-session history cache (None when disabled)
+history_cache = None
+
+# Global message partition/retention job (None when disabled)
+retention_job = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -40,7 +56,7 @@ async def lifespan(app: FastAPI):
     Application lifespan manager
     Initializes resources on startup, cleans up on shutdown
     """
-    global rag_engine
+    global rag_engine, message_queue, history_cache, retention_job
     
     logger.info(f"Starting DocBot Platform - Client: {CLIENT}, Environment: {ENVIRONMENT}")
     
@@ -48,6 +64,31 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
     await init_db()
     
+    if MESSAGE_WRITE_BEHIND:
+        message_queue = MessageWriteQueue(
+            max_size=int(os.getenv("MESSAGE_QUEUE_MAX_SIZE", 1000)),
+            batch_size=int(os.getenv("MESSAGE_FLUSH_BATCH_SIZE", 100)),
+            flush_interval_ms=float(os.getenv("MESSAGE_FLUSH_INTERVAL_MS", 200))
+        )
+        message_queue.start()
+    
+    if HISTORY_CACHE_ENABLED:
+        history_cache = InMemoryHistoryCache(
+            max_sessions=int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", 10000)),
+            idle_ttl_seconds=float(os.getenv("HISTORY_CACHE_IDLE_TTL", 1800))
+        )
+    
+    if RETENTION_JOB_ENABLED:
+        retention_job = RetentionJob(
+            retention_days=int(os.getenv("MESSAGE_RETENTION_DAYS", 0)),
+            archive_mode=os.getenv("MESSAGE_ARCHIVE_MODE", "archive"),
+            interval_seconds=float(os.getenv("RETENTION_JOB_INTERVAL_SECONDS", 3600)),
+            months_ahead=int(os.getenv("MESSAGE_PARTITIONS_AHEAD", 2))
+        )
+        retention_job.start()
+    else:
+        logger.warning("Retention job disabled: upcoming message partitions are only created at startup")
+    
     # Initialize RAG engine with client-specific configuration
     logger.info(f"Loading RAG engine for client: {CLIENT}")
     docs_path = f"examples/{CLIENT}/docs/"
@@ -64,6 +105,10 @@ async def lifespan(app: FastAPI):
     
     # Cleanup on shutdown
     logger.info("Shutting down DocBot Platform...")
+    if retention_job:
+        await retention_job.stop()
+    if message_queue:
+        await message_queue.stop()
     if rag_engine:
         await rag_engine.cleanup()
 
@@ -90,6 +135,7 @@ app.add_middleware(
 # Include routers
 app.include_router(health_router, prefix="/api/v1", tags=["Health"])
 app.include_router(chat_router, prefix="/api/v1", tags=["Chat"])
+app.include_router(config_router, prefix="/api/v1", tags=["Config"])
 
 
 # Root endpoint
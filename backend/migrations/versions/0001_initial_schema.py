@@ -0,0 +1,96 @@
+"""
+Initial schema: conversations and messages with hot-query indexes
+
+Written to be idempotent so it also adopts databases created by the old
+init.sql script or by Base.metadata.create_all.
+
+Hot queries and the index that serves each:
+- Session lookup / upsert (WHERE session_id = ..., ON CONFLICT (session_id))
+  -> unique constraint on conversations.session_id
+- Recent history (WHERE conversation_id = ... ORDER BY timestamp DESC LIMIT n)
+  and keyset pagination on (timestamp, id) in either direction
+  -> idx_messages_conversation_timestamp_id (conversation_id, timestamp, id),
+     range-scanned forward or backward
+
+The single-column indexes on messages(conversation_id) and messages(timestamp)
+are dropped: the first is a prefix of the composite index and no query filters
+on timestamp alone.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-02-01
+"""
+
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id VARCHAR(255) PRIMARY KEY DEFAULT gen_random_uuid()::VARCHAR,
+            session_id VARCHAR(255) NOT NULL UNIQUE,
+            client VARCHAR(100) NOT NULL,
+            mode VARCHAR(50) DEFAULT 'full_overview',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id VARCHAR(255) PRIMARY KEY DEFAULT gen_random_uuid()::VARCHAR,
+            conversation_id VARCHAR(255) NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+            role VARCHAR(50) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+            content TEXT NOT NULL,
+            sources JSONB,
+            visualization JSONB,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Databases created by create_all used plain JSON columns
+    op.execute("ALTER TABLE messages ALTER COLUMN sources TYPE JSONB USING sources::jsonb")
+    op.execute("ALTER TABLE messages ALTER COLUMN visualization TYPE JSONB USING visualization::jsonb")
+
+    # Keyset pagination needs a total order, so timestamps may not be NULL
+    op.execute("UPDATE messages SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    op.execute("ALTER TABLE messages ALTER COLUMN timestamp SET NOT NULL")
+    op.execute("ALTER TABLE messages ALTER COLUMN timestamp SET DEFAULT CURRENT_TIMESTAMP")
+
+    # Redundant with the unique constraint / composite index
+    op.execute("DROP INDEX IF EXISTS idx_conversations_session_id")
+    op.execute("DROP INDEX IF EXISTS idx_messages_conversation_id")
+    op.execute("DROP INDEX IF EXISTS idx_messages_timestamp")
+
+    op.execute("CREATE INDEX IF NOT EXISTS idx_conversations_client ON conversations(client)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp_id "
+        "ON messages(conversation_id, timestamp, id)"
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_updated_at_column()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql'
+    """)
+    op.execute("DROP TRIGGER IF EXISTS update_conversations_updated_at ON conversations")
+    op.execute("""
+        CREATE TRIGGER update_conversations_updated_at
+            BEFORE UPDATE ON conversations
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS messages")
+    op.execute("DROP TABLE IF EXISTS conversations")
+    op.execute("DROP FUNCTION IF EXISTS update_updated_at_column()")
@@ -0,0 +1,112 @@
+"""
+Partition messages by month on timestamp
+
+messages becomes a RANGE-partitioned table with one partition per calendar
+month (messages_yYYYYmMM) plus a default partition. Old months can then be
+detached and archived or dropped as a whole instead of deleted row by row
+(see chat/retention.py). Existing rows are copied into their monthly partitions.
+
+The primary key becomes (id, timestamp) because a partitioned table's unique
+constraints must include the partition key.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-02-15
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Creates the partition for the month containing month_start (idempotent)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_messages_partition(month_start DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            lower_bound DATE := date_trunc('month', month_start)::DATE;
+            partition_name TEXT := 'messages_y' || to_char(lower_bound, 'YYYY') || 'm' || to_char(lower_bound, 'MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, (lower_bound + INTERVAL '1 month')::DATE
+            );
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("ALTER TABLE messages RENAME TO messages_unpartitioned")
+    op.execute("ALTER INDEX IF EXISTS idx_messages_conversation_timestamp_id RENAME TO idx_messages_unpartitioned_conversation")
+    op.execute("ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey")
+
+    op.execute("""
+        CREATE TABLE messages (
+            id VARCHAR(255) NOT NULL DEFAULT gen_random_uuid()::VARCHAR,
+            conversation_id VARCHAR(255) NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+            role VARCHAR(50) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+            content TEXT NOT NULL,
+            sources JSONB,
+            visualization JSONB,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute(
+        "CREATE INDEX idx_messages_conversation_timestamp_id "
+        "ON messages(conversation_id, timestamp, id)"
+    )
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+    # One partition per month from the oldest existing message through two months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            partition_month DATE := date_trunc('month', COALESCE(
+                (SELECT min(timestamp) FROM messages_unpartitioned), CURRENT_DATE
+            ))::DATE;
+        BEGIN
+            WHILE partition_month <= date_trunc('month', CURRENT_DATE + INTERVAL '2 months')::DATE LOOP
+                PERFORM create_messages_partition(partition_month);
+                partition_month := (partition_month + INTERVAL '1 month')::DATE;
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("""
+        INSERT INTO messages (id, conversation_id, role, content, sources, visualization, timestamp)
+        SELECT id, conversation_id, role, content, sources, visualization, timestamp
+        FROM messages_unpartitioned
+    """)
+    op.execute("DROP TABLE messages_unpartitioned")
+
+
+def downgrade():
+    op.execute("ALTER TABLE messages RENAME TO messages_partitioned")
+    op.execute("ALTER INDEX idx_messages_conversation_timestamp_id RENAME TO idx_messages_partitioned_conversation")
+    op.execute("""
+        CREATE TABLE messages (
+            id VARCHAR(255) PRIMARY KEY DEFAULT gen_random_uuid()::VARCHAR,
+            conversation_id VARCHAR(255) NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+            role VARCHAR(50) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+            content TEXT NOT NULL,
+            sources JSONB,
+            visualization JSONB,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    op.execute(
+        "CREATE INDEX idx_messages_conversation_timestamp_id "
+        "ON messages(conversation_id, timestamp, id)"
+    )
+    op.execute("""
+        INSERT INTO messages (id, conversation_id, role, content, sources, visualization, timestamp)
+        SELECT id, conversation_id, role, content, sources, visualization, timestamp
+        FROM messages_partitioned
+    """)
+    op.execute("DROP TABLE messages_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS create_messages_partition(DATE)")
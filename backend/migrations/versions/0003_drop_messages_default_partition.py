@@ -0,0 +1,53 @@
+"""
+Drop the default messages partition
+
+ALTER TABLE ... DETACH PARTITION ... CONCURRENTLY, which the retention job
+uses so expired months are detached without an ACCESS EXCLUSIVE lock on
+messages, is not allowed while the table has a default partition. Rows that
+landed in messages_default are moved into their monthly partitions. Inserts
+now rely on monthly partitions existing ahead of time (migration 0002 and the
+retention job create them).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-03-01
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE messages DETACH PARTITION messages_default")
+    op.execute("""
+        DO $$
+        DECLARE
+            partition_month DATE;
+        BEGIN
+            FOR partition_month IN
+                SELECT DISTINCT date_trunc('month', timestamp)::DATE FROM messages_default
+                UNION
+                SELECT generate_series(
+                    date_trunc('month', CURRENT_DATE),
+                    date_trunc('month', CURRENT_DATE + INTERVAL '2 months'),
+                    INTERVAL '1 month'
+                )::DATE
+            LOOP
+                PERFORM create_messages_partition(partition_month);
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO messages (id, conversation_id, role, content, sources, visualization, timestamp)
+        SELECT id, conversation_id, role, content, sources, visualization, timestamp
+        FROM messages_default
+    """)
+    op.execute("DROP TABLE messages_default")
+
+
+def downgrade():
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
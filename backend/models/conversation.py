@@ -2,7 +2,8 @@
 Database models for conversations and messages
 """
 
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -21,16 +22,19 @@ class Conversation(Base):
     Tracks individual chat sessions
     """
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("idx_conversations_client", "client"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    session_id = Column(String, unique=True, nullable=False, index=True)
-    client = Column(String, nullable=False)  # maveric, demo, etc.
-    mode = Column(String, default="full_overview")  # Conversation mode
+    id = Column(String(255), primary_key=True, default=generate_uuid)
+    session_id = Column(String(255), unique=True, nullable=False)  # Unique constraint doubles as the lookup index
+    client = Column(String(100), nullable=False)  # maveric, demo, etc.
+    mode = Column(String(50), default="full_overview")  # Conversation mode
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship to messages
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Conversation(session_id={self.session_id}, client={self.client})>"
@@ -43,16 +47,25 @@ class Message(Base):
     """
     __tablename__ = "messages"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False)
-    role = Column(String, nullable=False)  # 'user' or 'assistant'
+    id = Column(String(255), primary_key=True, default=generate_uuid)
+    conversation_id = Column(String(255), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    role = Column(String(50), nullable=False)  # 'user', 'assistant' or 'system'
     content = Column(Text, nullable=False)
-    sources = Column(JSON, nullable=True)  # Source documents used for this response
-    visualization = Column(JSON, nullable=True)  # Visualization data if generated
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    sources = Column(JSONB, nullable=True)  # Source documents used for this response
+    visualization = Column(JSONB, nullable=True)  # Visualization data if generated
+    # Part of the primary key: messages is range-partitioned by month on timestamp
+    timestamp = Column(DateTime, primary_key=True, nullable=False, default=datetime.utcnow, server_default=text("CURRENT_TIMESTAMP"))
     
     # Relationship to conversation
     conversation = relationship("Conversation", back_populates="messages")
     
+    # Mirrors migrations/versions; the migrations are authoritative for the schema
+    __table_args__ = (
+        CheckConstraint("role IN ('user', 'assistant', 'system')", name="messages_role_check"),
+        # Backs history reads and keyset pagination on (timestamp, id) within a conversation
+        Index("idx_messages_conversation_timestamp_id", "conversation_id", "timestamp", "id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+    
     def __repr__(self):
         return f"<Message(role={self.role}, timestamp={self.timestamp})>"
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+In-process caches for the RAG pipeline
+Bounded LRU cache with optional TTL and hit/miss/eviction counters
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def normalize_query(query: str, lowercase: bool = True) -> str:
+    """
+    Normalize query text for use as a cache key
+
+    Args:
+        query: Raw query text
+        lowercase: Fold case (only safe when the consumer is case-insensitive)
+
+    Returns:
+        Query with collapsed whitespace, lowercased unless lowercase is False
+    """
+    key = re.sub(r"\s+", " ", query).strip()
+    return key.lower() if lowercase else key
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with optional time-to-live
+
+    Safe to share between the event loop and executor threads.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None, sliding: bool = False):
+        """
+        Initialize cache
+
+        Args:
+            max_size: Maximum number of entries (0 disables caching)
+            ttl_seconds: Entry lifetime in seconds (None or 0 for no expiry)
+            sliding: Restart an entry's lifetime on every hit (idle expiry)
+        """
+        self.max_size = max(0, max_size)
+        self.ttl = ttl_seconds or None
+        self.sliding = sliding
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a key, refreshing its recency
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if self.sliding:
+                self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a key without affecting recency or hit/miss counters
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry when full
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        if self.max_size == 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        """
+        Remove a key if present
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
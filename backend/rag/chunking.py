@@ -0,0 +1,492 @@
+"""
+Structure-aware document chunking
+Splits Markdown by heading, Python by top-level definition, YAML by top-level
+key or service and CSV into a schema summary, each chunk carrying section metadata
+"""
+
+import re
+import io
+import ast
+import csv
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+# Bump when chunk boundaries or metadata change so persistent indexes are rebuilt
+CHUNKER_VERSION = 6
+
+# A chunk is {"text": str, "metadata": {str: str | int | float | bool}}
+Chunk = Dict[str, Any]
+ChunkFn = Callable[[str, int, int], List[Chunk]]
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+YAML_KEY = re.compile(r"^([A-Za-z0-9_.\-\"']+)\s*:")
+
+CSV_SAMPLE_ROWS = 5
+
+
+def make_chunk(text: str, **metadata) -> Chunk:
+    """
+    Build a chunk, dropping metadata values ChromaDB cannot store
+
+    Args:
+        text: Chunk text
+        **metadata: Section metadata
+
+    Returns:
+        Chunk dict
+    """
+    return {
+        "text": text.strip(),
+        "metadata": {k: v for k, v in metadata.items() if isinstance(v, (str, int, float, bool))}
+    }
+
+
+def chunk_text(content: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Split plain text into overlapping chunks, preferring sentence or line breaks
+
+    Every step advances by at least one character, so an overlap close to or
+    larger than the break point can no longer stall or re-emit the same chunk.
+
+    Args:
+        content: Text to split
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters repeated between consecutive chunks
+
+    Returns:
+        List of non-empty text pieces
+    """
+    chunk_size = max(1, chunk_size)
+    chunk_overlap = max(0, min(chunk_overlap, chunk_size - 1))
+    pieces = []
+    start = 0
+
+    while start < len(content):
+        end = min(start + chunk_size, len(content))
+
+        if end < len(content):
+            window = content[start:end]
+            break_point = max(window.rfind('.'), window.rfind('\n'))
+            # Only break where the next chunk still starts past this one
+            if break_point + 1 > chunk_overlap:
+                end = start + break_point + 1
+
+        pieces.append(content[start:end])
+        if end >= len(content):
+            break
+        start = max(end - chunk_overlap, start + 1)
+
+    return [p.strip() for p in pieces if p.strip()]
+
+
+def _pack_blocks(blocks: List[str], chunk_size: int, chunk_overlap: int, separator: str = "\n\n") -> List[str]:
+    """
+    Greedily join consecutive blocks into pieces of at most chunk_size characters
+
+    Blocks longer than chunk_size are split with chunk_text.
+    """
+    pieces = []
+    current = ""
+    for block in blocks:
+        if len(block) > chunk_size:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.extend(chunk_text(block, chunk_size, chunk_overlap))
+            continue
+        candidate = f"{current}{separator}{block}" if current else block
+        if len(candidate) > chunk_size:
+            pieces.append(current)
+            current = block
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(
+    content: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    state: Optional[Dict[str, Any]] = None
+) -> List[Chunk]:
+    """
+    Split Markdown by heading hierarchy
+
+    Each section holds the text under one heading. Sections are split on
+    paragraph boundaries without breaking fenced code blocks, and continuation
+    pieces repeat the heading path so they embed with their context. Adjacent
+    small sections are merged up to chunk_size.
+
+    Args:
+        content: Markdown text
+        chunk_size: Target maximum characters per chunk
+        chunk_overlap: Overlap used when a single block must be split
+        state: Per-file state carried between segments of one file; its
+            "headings" entry holds the headings still open at the end of the
+            previous segment, so text before this segment's first heading keeps
+            its heading path
+
+    Returns:
+        List of chunks with section (heading path) and heading_level metadata
+    """
+    sections = []  # (heading path, level, blocks, continues a section of the previous segment)
+    # Open (level, title) pairs, outermost first; updated in place for the next segment
+    headings: List[tuple] = state.setdefault("headings", []) if state is not None else []
+    blocks: List[str] = []
+    block: List[str] = []
+    level = headings[-1][0] if headings else 0
+    continued = bool(headings)
+    in_fence = False
+
+    def close_block():
+        if block and "".join(block).strip():
+            blocks.append("\n".join(block).strip("\n"))
+        block.clear()
+
+    def close_section():
+        nonlocal continued
+        close_block()
+        if blocks:
+            sections.append((" > ".join(title for _, title in headings), level, list(blocks), continued))
+        blocks.clear()
+        continued = False
+
+    for line in content.splitlines():
+        if FENCE.match(line):
+            if not in_fence:
+                close_block()
+            block.append(line)
+            if in_fence:
+                close_block()
+            in_fence = not in_fence
+            continue
+
+        heading = None if in_fence else HEADING.match(line)
+        if heading:
+            close_section()
+            level = len(heading.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, heading.group(2)))
+            blocks.append(line)
+        elif not in_fence and not line.strip():
+            close_block()
+        else:
+            block.append(line)
+    close_section()
+
+    chunks = []
+    pending = None  # small sections merged until chunk_size is reached
+    for section, section_level, section_blocks, section_continued in sections:
+        # A continued section has no heading line of its own, so it is headed by its path
+        if section_continued:
+            section_blocks = [section] + section_blocks
+        body = "\n\n".join(section_blocks)
+        if len(body) <= chunk_size:
+            if pending and len(pending["text"]) + 2 + len(body) <= chunk_size:
+                pending["text"] += "\n\n" + body
+                pending["metadata"]["sections"] += 1
+                continue
+            if pending:
+                chunks.append(pending)
+            pending = make_chunk(body, section=section, heading_level=section_level, chunk_type="markdown")
+            pending["metadata"]["sections"] = 1
+            continue
+
+        if pending:
+            chunks.append(pending)
+            pending = None
+        prefix = f"{section}\n\n" if section else ""
+        for idx, piece in enumerate(_pack_blocks(section_blocks, chunk_size, chunk_overlap)):
+            chunks.append(make_chunk(
+                piece if idx == 0 or not prefix else prefix + piece,
+                section=section, heading_level=section_level, chunk_type="markdown", part=idx + 1
+            ))
+    if pending:
+        chunks.append(pending)
+
+    return [c for c in chunks if c["text"]]
+
+
+def _split_lines(lines: List[str], chunk_size: int) -> List[str]:
+    """Pack whole lines into pieces of at most chunk_size characters (longer lines are split)"""
+    return _pack_blocks(lines, chunk_size, 0, separator="\n")
+
+
+def chunk_python(content: str, chunk_size: int, chunk_overlap: int) -> List[Chunk]:
+    """
+    Split Python source by top-level function and class
+
+    The module docstring, imports and other top-level statements between
+    definitions are grouped into "module" chunks. A class longer than chunk_size
+    is split per method, each piece repeating the class line; an oversized
+    function is split on line boundaries. Falls back to text chunking when the
+    source does not parse.
+
+    Args:
+        content: Python source
+        chunk_size: Target maximum characters per chunk
+        chunk_overlap: Overlap used by the text fallback
+
+    Returns:
+        List of chunks with section, symbol, kind and line range metadata
+    """
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return [make_chunk(p, section="module", chunk_type="text") for p in chunk_text(content, chunk_size, chunk_overlap)]
+
+    lines = content.splitlines()
+
+    def node_start(node) -> int:
+        decorators = getattr(node, "decorator_list", [])
+        return min([node.lineno] + [d.lineno for d in decorators])
+
+    def source(start: int, end: int) -> str:
+        return "\n".join(lines[start - 1:end])
+
+    chunks = []
+    loose: List[tuple] = []  # (first line, last line) of top-level statements outside definitions
+
+    def module_chunk(start: int, end: int, text: str) -> Chunk:
+        return make_chunk(text, section="module", kind="module", chunk_type="python", line_start=start, line_end=end)
+
+    def flush_loose():
+        # Pack whole statements; only a statement longer than chunk_size is split by lines
+        current = None  # [start, end, text]
+        for start, end in loose:
+            text = source(start, end).strip("\n")
+            if not text.strip():
+                continue
+            if current and len(current[2]) + 1 + len(text) <= chunk_size:
+                current[1], current[2] = end, current[2] + "\n" + text
+                continue
+            if current:
+                chunks.append(module_chunk(*current))
+                current = None
+            if len(text) <= chunk_size:
+                current = [start, end, text]
+            else:
+                chunks.extend(module_chunk(start, end, piece) for piece in _split_lines(text.splitlines(), chunk_size))
+        if current:
+            chunks.append(module_chunk(*current))
+        loose.clear()
+
+    cursor = 1
+    for node in tree.body:
+        start, end = node_start(node), node.end_lineno
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            loose.append((cursor, end))
+            cursor = end + 1
+            continue
+
+        # Comments directly above a definition belong to it
+        while start > cursor and lines[start - 2].lstrip().startswith("#"):
+            start -= 1
+        if cursor < start:
+            loose.append((cursor, start - 1))
+        flush_loose()
+
+        kind = "class" if isinstance(node, ast.ClassDef) else "function"
+        text = source(start, end)
+        section = f"{kind} {node.name}"
+
+        if len(text) <= chunk_size:
+            chunks.append(make_chunk(
+                text, section=section, symbol=node.name, kind=kind, chunk_type="python",
+                line_start=start, line_end=end
+            ))
+        elif kind == "class":
+            header_end = node.body[0].lineno - 1 if node.body else end
+            header = source(start, max(node.lineno, header_end))
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            body_start = node.lineno + 1
+            for member in methods:
+                member_start = node_start(member)
+                member_text = source(member_start, member.end_lineno)
+                # Class attributes and docstring ride along with the first method
+                if body_start < member_start and member is methods[0]:
+                    member_text = source(body_start, member.end_lineno)
+                    member_start = body_start
+                for piece in _split_lines(member_text.splitlines(), max(1, chunk_size - len(header))):
+                    chunks.append(make_chunk(
+                        f"{header}\n{piece}", section=f"{section}.{member.name}", symbol=f"{node.name}.{member.name}",
+                        kind="method", chunk_type="python", line_start=member_start, line_end=member.end_lineno
+                    ))
+            if not methods:
+                for piece in _split_lines(text.splitlines(), chunk_size):
+                    chunks.append(make_chunk(
+                        piece, section=section, symbol=node.name, kind=kind, chunk_type="python",
+                        line_start=start, line_end=end
+                    ))
+        else:
+            signature = lines[node.lineno - 1].strip()
+            for idx, piece in enumerate(_split_lines(text.splitlines(), chunk_size)):
+                chunks.append(make_chunk(
+                    piece if idx == 0 else f"{signature}  # ...\n{piece}",
+                    section=section, symbol=node.name, kind=kind, chunk_type="python",
+                    line_start=start, line_end=end, part=idx + 1
+                ))
+        cursor = end + 1
+
+    if cursor <= len(lines):
+        loose.append((cursor, len(lines)))
+    flush_loose()
+
+    return [c for c in chunks if c["text"]]
+
+
+def chunk_yaml(content: str, chunk_size: int, chunk_overlap: int) -> List[Chunk]:
+    """
+    Split YAML by top-level key, and a Compose file's services by service
+
+    Works on indentation so no YAML parser is needed; each service chunk
+    repeats the "services:" line so it stays valid YAML on its own. Services
+    longer than chunk_size are split on line boundaries, and every piece
+    repeats both the "services:" line and the service's key line.
+
+    Args:
+        content: YAML text
+        chunk_size: Target maximum characters per chunk
+        chunk_overlap: Overlap used when a single over-long line must be split
+
+    Returns:
+        List of chunks with section (key path) metadata
+    """
+    lines = content.splitlines()
+    top_level = []  # (key, start index)
+    for idx, line in enumerate(lines):
+        match = YAML_KEY.match(line)
+        if match:
+            top_level.append((match.group(1).strip("\"'"), idx))
+
+    if not top_level:
+        return [make_chunk(p, section="document", chunk_type="yaml") for p in _split_lines(lines, chunk_size)]
+
+    chunks = []
+    preamble = "\n".join(lines[:top_level[0][1]]).strip()
+    if preamble:
+        chunks.append(make_chunk(preamble, section="preamble", chunk_type="yaml"))
+
+    for pos, (key, start) in enumerate(top_level):
+        end = top_level[pos + 1][1] if pos + 1 < len(top_level) else len(lines)
+        block = lines[start:end]
+
+        children = []
+        child_indent = None
+        for offset, line in enumerate(block[1:], start=1):
+            stripped = line.lstrip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            indent = len(line) - len(stripped)
+            if child_indent is None:
+                child_indent = indent
+            if indent == child_indent and YAML_KEY.match(stripped):
+                children.append((YAML_KEY.match(stripped).group(1).strip("\"'"), offset))
+
+        if key == "services" and children:
+            for cpos, (name, cstart) in enumerate(children):
+                cend = children[cpos + 1][1] if cpos + 1 < len(children) else len(block)
+                header = f"{block[0]}\n{block[cstart]}"
+                body = "\n".join(block[cstart + 1:cend]).rstrip()
+                if len(header) + 1 + len(body) <= chunk_size or not body:
+                    pieces = [f"{header}\n{body}".rstrip()]
+                else:
+                    budget = max(1, chunk_size - len(header) - 1)
+                    pieces = [
+                        f"{header}\n{piece}"
+                        for piece in _pack_blocks(body.split("\n"), budget, chunk_overlap, separator="\n")
+                    ]
+                chunks.extend(
+                    make_chunk(piece, section=f"services.{name}", service=name, chunk_type="yaml")
+                    for piece in pieces
+                )
+            continue
+
+        for idx, piece in enumerate(_split_lines(block, chunk_size)):
+            chunks.append(make_chunk(
+                piece if idx == 0 else f"{block[0]}\n{piece}", section=key, chunk_type="yaml"
+            ))
+
+    return [c for c in chunks if c["text"]]
+
+
+def _infer_type(values: List[str]) -> str:
+    """Infer a column type name from sample values"""
+    present = [v for v in values if v.strip()]
+    if not present:
+        return "empty"
+    for type_name, cast in (("int", int), ("float", float)):
+        try:
+            for value in present:
+                cast(value)
+            return type_name
+        except ValueError:
+            continue
+    return "string"
+
+
+def chunk_csv(
+    content: Union[str, Iterable[str]],
+    chunk_size: int,
+    chunk_overlap: int,
+    sample_rows: int = CSV_SAMPLE_ROWS
+) -> List[Chunk]:
+    """
+    Summarize a CSV file as its schema plus sample rows
+
+    Data rows are not embedded one by one: questions about tabular sources are
+    about column names, meanings and shapes, which the schema chunk answers.
+    Rows are read one at a time, so a line iterator (such as an open file)
+    is summarized without loading the whole file.
+
+    Args:
+        content: CSV text or an iterable of CSV lines
+        chunk_size: Unused (one schema chunk per file)
+        chunk_overlap: Unused
+        sample_rows: Number of data rows included as examples
+
+    Returns:
+        Single-element list with the schema chunk (empty for an empty file)
+    """
+    reader = csv.reader(io.StringIO(content) if isinstance(content, str) else content)
+    header = next(reader, None)
+    if not header:
+        return []
+
+    samples = []
+    row_count = 0
+    column_values: List[List[str]] = [[] for _ in header]
+    for row in reader:
+        row_count += 1
+        if row_count <= max(sample_rows, 100):
+            for idx, value in enumerate(row[:len(header)]):
+                column_values[idx].append(value)
+        if row_count <= sample_rows:
+            samples.append(row)
+
+    columns = [f"- {name} ({_infer_type(values)})" for name, values in zip(header, column_values)]
+    sample_text = "\n".join(",".join(row) for row in [header] + samples)
+    text = (
+        f"CSV with {len(header)} columns and {row_count} rows.\n"
+        f"Columns:\n" + "\n".join(columns) +
+        f"\n\nSample rows:\n{sample_text}"
+    )
+    return [make_chunk(text, section="schema", chunk_type="csv", columns=",".join(header), rows=row_count)]
+
+
+def chunk_plain(content: str, chunk_size: int, chunk_overlap: int) -> List[Chunk]:
+    """
+    Split unstructured text
+
+    Args:
+        content: Text
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters repeated between consecutive chunks
+
+    Returns:
+        List of chunks
+    """
+    return [make_chunk(p, chunk_type="text") for p in chunk_text(content, chunk_size, chunk_overlap)]
@@ -0,0 +1,108 @@
+"""
+Result diversification
+Duplicate suppression and maximal marginal relevance over retrieved chunk embeddings
+"""
+
+import re
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def content_fingerprint(text: str) -> str:
+    """
+    Hash chunk text ignoring case and whitespace
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Fingerprint shared by exact duplicates (e.g. the same section in two copies of a README)
+    """
+    return hashlib.sha1(re.sub(r"\s+", " ", text).strip().lower().encode('utf-8')).hexdigest()
+
+
+def suppress_duplicates(
+    docs: List[Dict[str, Any]],
+    embeddings: Optional[np.ndarray] = None,
+    threshold: float = 0.95
+) -> List[int]:
+    """
+    Select chunks that are neither exact nor near duplicates of a better-ranked chunk
+
+    Args:
+        docs: Chunks in rank order
+        embeddings: Chunk embeddings aligned with docs (skips near-duplicate checks when None)
+        threshold: Cosine similarity at or above which two chunks are near duplicates
+
+    Returns:
+        Indexes of kept chunks, in rank order
+    """
+    seen = set()
+    kept: List[int] = []
+    unit = _normalize_rows(embeddings) if embeddings is not None and len(embeddings) else None
+
+    for idx, doc in enumerate(docs):
+        fingerprint = content_fingerprint(doc["content"])
+        if fingerprint in seen:
+            continue
+        if unit is not None and kept and float(np.max(unit[kept] @ unit[idx])) >= threshold:
+            continue
+        seen.add(fingerprint)
+        kept.append(idx)
+
+    return kept
+
+
+def maximal_marginal_relevance(
+    query_embedding: Sequence[float],
+    embeddings: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.7,
+    relevance: Optional[Sequence[float]] = None
+) -> List[int]:
+    """
+    Greedily pick k items balancing relevance against similarity to items already picked
+
+    Each step selects argmax of lambda * relevance - (1 - lambda) * max similarity
+    to the selected set, with cosine similarity between embeddings.
+
+    Args:
+        query_embedding: Query vector
+        embeddings: Candidate vectors (one row per candidate)
+        k: Number of items to select
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+        relevance: Relevance scores in [0, 1] (default: cosine similarity to the query)
+
+    Returns:
+        Indexes of selected candidates, in selection order
+    """
+    if k <= 0 or not len(embeddings):
+        return []
+
+    unit = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    if relevance is None:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        relevance_scores = unit @ query
+    else:
+        relevance_scores = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance_scores))]
+    max_similarity = unit @ unit[selected[0]]
+
+    while len(selected) < min(k, len(unit)):
+        scores = lambda_mult * relevance_scores - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, unit @ unit[best])
+
+    return selected
@@ -5,15 +5,38 @@ Handles document loading, embedding, retrieval, and context generation
 
 import os
 import json
+import time
+import hashlib
+import asyncio
+import contextlib
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from loguru import logger
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 import anthropic
+import httpx
+import numpy as np
 from dotenv import load_dotenv
 
+from rag.manifest import CorpusManifest, IndexLock
+from rag.indexer import IncrementalIndexer
+from rag.executor import BoundedExecutor
+from rag.query_embedder import BatchingQueryEmbedder
+from rag.cache import LRUCache, normalize_query
+from rag.response_cache import SemanticResponseCache
+from rag.lexical import BM25Index, reciprocal_rank_fusion
+from rag.chunking import CHUNKER_VERSION
+from rag.reranker import CrossEncoderReranker
+from rag.diversity import suppress_duplicates, maximal_marginal_relevance
+from rag.prompt_builder import PromptBuilder, build_request
+from rag.llm_stub import StubLLMClient
+from rag.llm_usage import LLMUsageTracker
+from rag.modules import ModuleTagger, module_field
+from rag.file_types import CorpusSelector, chunk_file, file_type_for
+
 load_dotenv()
 
 
@@ -33,24 +56,110 @@ class RAGEngine:
         self.client = client
         self.docs_path = Path(docs_path)
         self.config = self._load_config()
+        self.config_version = self._config_version()
+        self.corpus_selector = CorpusSelector.from_config(self.config)
+        self.module_tagger = ModuleTagger(self.config.get("modules", []))
+        self.module_chunk_counts: Dict[str, int] = {}
         
         # Embedding model
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
         self.embedding_model = None
+        self.embedding_lowercase = False
+        self.query_embedder = None
+        self.query_batch_window_ms = float(os.getenv("QUERY_BATCH_WINDOW_MS", 5))
+        self.query_batch_max_size = int(os.getenv("QUERY_BATCH_MAX_SIZE", 32))
+        
+        # Normalized query text -> embedding, for canned and repeated questions
+        self.query_cache = LRUCache(
+            max_size=int(os.getenv("QUERY_CACHE_SIZE", 1024)),
+            ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", 3600))
+        )
+        
+        # Opt-in cache of whole answers for semantically repeated questions
+        self.response_cache = None
+        if os.getenv("RESPONSE_CACHE_ENABLED", "False").lower() == "true":
+            self.response_cache = SemanticResponseCache(
+                threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.95)),
+                max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 512)),
+                ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", 86400))
+            )
         
-        # Vector database
+        # Vector database (persistent when VECTOR_INDEX_DIR is set, in-memory otherwise)
+        self.index_dir = os.getenv("VECTOR_INDEX_DIR", "").strip() or None
         self.chroma_client = None
         self.collection = None
+        self.manifest = None
+        self.corpus_version = None
+        self.last_index_report = None
         
         # LLM client
         self.llm_provider = os.getenv("LLM_PROVIDER", "anthropic")
         self.llm_model = os.getenv("LLM_MODEL", "claude-sonnet-4-5-20250929")
-        self.anthropic_client = None
+        self.llm_client = None
+        # Mark the stable per-mode system prompt for provider-side caching
+        self.prompt_caching = os.getenv("PROMPT_CACHING", "True").lower() == "true"
+        self.system_prompts: Dict[str, str] = {}
+        self.llm_usage = LLMUsageTracker()
+        self.llm_max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", 64))
+        self.llm_timeout = float(os.getenv("LLM_TIMEOUT", 120))
+        
+        # Cap on concurrent in-flight LLM requests for this worker
+        self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+        self.llm_semaphore = asyncio.Semaphore(self.llm_max_concurrency)
         
         # Configuration
         self.chunk_size = int(os.getenv("CHUNK_SIZE", 500))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", 50))
         self.max_results = int(os.getenv("MAX_RESULTS", 5))
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+        
+        # Hybrid retrieval: BM25 over the same chunks, fused with dense results by RRF
+        self.hybrid_enabled = os.getenv("HYBRID_RETRIEVAL", "True").lower() == "true"
+        self.hybrid_dense_weight = float(os.getenv("HYBRID_DENSE_WEIGHT", 1.0))
+        self.hybrid_lexical_weight = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 1.0))
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", 20))
+        self.rrf_k = int(os.getenv("RRF_K", 60))
+        self.lexical_index = BM25Index(
+            k1=float(os.getenv("BM25_K1", 1.5)),
+            b=float(os.getenv("BM25_B", 0.75))
+        )
+        
+        # Optional cross-encoder re-ranking of oversampled candidates
+        self.reranker = None
+        if os.getenv("RERANK_ENABLED", "False").lower() == "true":
+            self.reranker = CrossEncoderReranker(
+                model_name=os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+                batch_size=int(os.getenv("RERANK_BATCH_SIZE", 16)),
+                cache_size=int(os.getenv("RERANK_CACHE_SIZE", 4096)),
+                cache_ttl_seconds=float(os.getenv("RERANK_CACHE_TTL", 0))
+            )
+        self.rerank_candidates = int(os.getenv("RERANK_CANDIDATES", 20))
+        min_score = os.getenv("RERANK_MIN_SCORE", "").strip()
+        self.rerank_min_score = float(min_score) if min_score else None
+        self.rerank_budget_ms = float(os.getenv("RERANK_BUDGET_MS", 300))
+        
+        # Duplicate suppression + maximal marginal relevance over the candidate pool
+        self.diversify_enabled = os.getenv("MMR_ENABLED", "True").lower() == "true"
+        self.mmr_lambda = float(os.getenv("MMR_LAMBDA", 0.7))
+        self.mmr_candidates = int(os.getenv("MMR_CANDIDATES", 20))
+        self.duplicate_threshold = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", 0.95))
+        
+        # Input token budget for system prompt, history and context
+        self.prompt_builder = PromptBuilder(
+            input_token_budget=int(os.getenv("PROMPT_INPUT_TOKEN_BUDGET", 6000)),
+            max_history_messages=int(os.getenv("PROMPT_HISTORY_MESSAGES", 5)),
+            history_message_tokens=int(os.getenv("PROMPT_HISTORY_MESSAGE_TOKENS", 400)),
+            context_share=float(os.getenv("PROMPT_CONTEXT_SHARE", 0.7)),
+            min_chunk_tokens=int(os.getenv("PROMPT_MIN_CHUNK_TOKENS", 64)),
+            encoding_name=os.getenv("PROMPT_TOKEN_ENCODING", "cl100k_base")
+        )
+        
+        # Blocking query embedding and vector search run here instead of on the event loop
+        self.retrieval_executor = BoundedExecutor(
+            name="retrieval",
+            max_workers=int(os.getenv("RETRIEVAL_WORKERS", 4)),
+            max_queue=int(os.getenv("RETRIEVAL_QUEUE_DEPTH", 32))
+        )
         
         logger.info(f"RAG Engine initialized for client: {client}")
     
@@ -71,6 +180,15 @@ class RAGEngine:
             logger.info(f"Loaded config for {self.client}")
             return config
     
+    def _config_version(self) -> str:
+        """Fingerprint of the loaded config; cached answers are only valid for the config they came from"""
+        return hashlib.sha256(json.dumps(self.config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    
+    @property
+    def response_cache_version(self) -> str:
+        """Version the response cache is bound to: the indexed corpus plus the client config"""
+        return f"{self.corpus_version}-{self.config_version}"
+    
     async def initialize(self):
         """
         Initialize all components asynchronously
@@ -80,33 +198,140 @@ class RAGEngine:
         # Initialize embedding model
         logger.info(f"Loading embedding model: {self.embedding_model_name}")
         self.embedding_model = SentenceTransformer(self.embedding_model_name)
-        
-        # Initialize ChromaDB
-        logger.info("Initializing ChromaDB...")
-        self.chroma_client = chromadb.Client(Settings(
-            anonymized_telemetry=False,
-            allow_reset=True
-        ))
-        
-        # Create or get collection
-        collection_name = f"docbot_{self.client}"
-        self.collection = self.chroma_client.get_or_create_collection(
-            name=collection_name,
-            metadata={"client": self.client}
+        # Query cache keys may only fold case when the model's tokenizer does too
+        self.embedding_lowercase = bool(getattr(getattr(self.embedding_model, "tokenizer", None), "do_lower_case", False))
+        self.query_embedder = BatchingQueryEmbedder(
+            encode_fn=self._encode_queries,
+            executor=self.retrieval_executor,
+            window_ms=self.query_batch_window_ms,
+            max_batch_size=self.query_batch_max_size
         )
+        if self.reranker:
+            self.reranker.load()
         
         # Initialize LLM client
         if self.llm_provider == "anthropic":
             api_key = os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY not found in environment")
-            self.anthropic_client = anthropic.Anthropic(api_key=api_key)
+            # Async client over one shared, pooled HTTP connection set
+            self.llm_client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                timeout=self.llm_timeout,
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.llm_max_connections,
+                        max_keepalive_connections=self.llm_max_connections
+                    )
+                )
+            )
+        elif self.llm_provider == "stub":
+            logger.warning("Using offline stub LLM provider")
+            self.llm_client = StubLLMClient(token_delay_ms=float(os.getenv("STUB_LLM_TOKEN_DELAY_MS", 0)))
+        
+        # System prompts are constant per mode until the config changes
+        self._prepare_system_prompts()
+        
+        # One worker at a time opens, checks and updates a shared persistent index;
+        # workers that waited find the manifest up to date and just load the result
+        index_lock = IndexLock(Path(self.index_dir) / ".index.lock") if self.index_dir else contextlib.nullcontext()
+        async with index_lock:
+            # Initialize ChromaDB
+            chroma_settings = Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+            if self.index_dir:
+                logger.info(f"Initializing persistent ChromaDB at {self.index_dir}...")
+                self.chroma_client = chromadb.PersistentClient(path=self.index_dir, settings=chroma_settings)
+                self.manifest = CorpusManifest(Path(self.index_dir) / f"manifest_{self.client}.json")
+                self.manifest.load()
+            else:
+                logger.info("Initializing in-memory ChromaDB...")
+                self.chroma_client = chromadb.Client(chroma_settings)
+            
+            # Create or get collection
+            self.collection = self._get_collection()
+            
+            # Load and embed documents
+            await self._load_documents()
         
-        # Load and embed documents
-        await self._load_documents()
+        if self.hybrid_enabled:
+            self._build_lexical_index()
+        self._count_module_chunks()
         
         logger.info("RAG engine initialization complete")
     
+    def _prepare_system_prompts(self):
+        """Precompute the system prompt of every conversation mode"""
+        modes = {"full_overview", "module_deep_dive", "quick_answer"} | set(self.config.get("conversation_modes", {}))
+        self.system_prompts = {mode: self._build_system_prompt(mode) for mode in sorted(modes)}
+        logger.info(f"Prepared system prompts for modes: {', '.join(self.system_prompts)}")
+    
+    def reload_config(self):
+        """
+        Reload the client configuration and rebuild what derives from it
+        
+        Refreshes the per-mode system prompts, the corpus file selection and
+        the module tagger, and drops cached answers built with the old config.
+        Chunks keep the module tags they were indexed with until documents are
+        re-indexed on the next start.
+        """
+        self.config = self._load_config()
+        self.config_version = self._config_version()
+        self.corpus_selector = CorpusSelector.from_config(self.config)
+        self.module_tagger = ModuleTagger(self.config.get("modules", []))
+        if self.collection is not None:
+            self._count_module_chunks()
+        self._prepare_system_prompts()
+        if self.response_cache:
+            self.response_cache.invalidate(self.response_cache_version)
+    
+    def _system_prompt(self, mode: str) -> str:
+        """Get the precomputed system prompt of a mode, building it for unknown modes"""
+        prompt = self.system_prompts.get(mode)
+        if prompt is None:
+            prompt = self._build_system_prompt(mode)
+        return prompt
+    
+    def _record_usage(self, usage) -> Dict[str, int]:
+        """
+        Add the token usage of one LLM response to the running totals
+        
+        Args:
+            usage: Usage object of the response
+            
+        Returns:
+            Token counts of this response
+        """
+        counts = self.llm_usage.record(usage)
+        logger.info(
+            f"LLM usage: {counts['input_tokens']} input, {counts['output_tokens']} output, "
+            f"{counts['cache_read_input_tokens']} cache read, {counts['cache_creation_input_tokens']} cache write"
+        )
+        return counts
+    
+    def llm_usage_stats(self) -> Dict[str, Any]:
+        """Cumulative LLM token usage, including prompt cache reads and writes"""
+        return dict(self.llm_usage.stats(), provider=self.llm_provider, prompt_caching=self.prompt_caching)
+    
+    def _get_collection(self):
+        """Create or get the vector collection for this client"""
+        return self.chroma_client.get_or_create_collection(
+            name=f"docbot_{self.client}",
+            metadata={"client": self.client}
+        )
+    
+    def _index_settings(self) -> Dict[str, Any]:
+        """Settings that invalidate every stored embedding when they change"""
+        return {
+            "embedding_model": self.embedding_model_name,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunker_version": CHUNKER_VERSION,
+            "module_tags": self.module_tagger.settings()
+        }
+    
     async def _load_documents(self):
         """
         Load documentation files and create embeddings
@@ -115,107 +340,312 @@ class RAGEngine:
             logger.warning(f"Documentation path does not exist: {self.docs_path}")
             return
         
-        # Get all markdown files
-        doc_files = list(self.docs_path.glob("*.md"))
+        # Every file type the ingester produces, filtered by the config's include/exclude patterns
+        doc_files = self.corpus_selector.select(self.docs_path)
         
         if not doc_files:
             logger.warning(f"No documentation files found in {self.docs_path}")
             return
         
-        logger.info(f"Found {len(doc_files)} documentation files")
-        
-        all_chunks = []
-        all_embeddings = []
-        all_metadatas = []
-        all_ids = []
+        type_counts = Counter(file_type_for(doc_file) for doc_file in doc_files)
+        logger.info(
+            f"Found {len(doc_files)} documentation files "
+            f"({', '.join(f'{count} {name}' for name, count in sorted(type_counts.items()))})"
+        )
         
-        for doc_file in doc_files:
-            logger.info(f"Processing {doc_file.name}...")
+        # Skip embedding entirely when the persistent index already matches the corpus
+        doc_paths = {doc_file.name: doc_file for doc_file in doc_files}
+        file_hashes = CorpusManifest.hash_files(doc_files)
+        current_manifest = CorpusManifest.build(self._index_settings(), file_hashes)
+        self.corpus_version = current_manifest["corpus_version"]
+        
+        previous = {}
+        if self.manifest:
+            if self.manifest.matches(current_manifest, chunk_count=self.collection.count()):
+                logger.info(f"Persistent index is up to date (corpus {self.corpus_version}), skipping embedding")
+                return
             
-            with open(doc_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Chunk the document
-            chunks = self._chunk_document(content)
+            if self.manifest.compatible(current_manifest["settings"]):
+                previous = self.manifest.data
+            elif self.collection.count() > 0:
+                logger.info("Index settings changed since last build, rebuilding persistent index")
+                self.chroma_client.delete_collection(self.collection.name)
+                self.collection = self._get_collection()
+        
+        indexer = IncrementalIndexer(
+            collection=self.collection,
+            chunk_fn=self._chunk_file,
+            embed_fn=self._embed_documents,
+            client=self.client
+        )
+        chunk_ids, report = indexer.run(file_hashes, doc_paths, previous)
+        
+        logger.info(
+            f"Index updated: {len(report['files_added'])} files added, "
+            f"{len(report['files_changed'])} changed, {len(report['files_removed'])} removed, "
+            f"{report['files_unchanged']} unchanged; {report['chunks_added']} chunks embedded, "
+            f"{report['chunks_deleted']} deleted, {report['chunks_reused']} reused "
+            f"({report['chunks_refreshed']} with updated metadata)"
+        )
+        self.last_index_report = report
+        
+        if self.response_cache:
+            self.response_cache.invalidate(self.response_cache_version)
+        
+        if self.manifest:
+            self.manifest.save(dict(
+                current_manifest,
+                chunks=chunk_ids,
+                chunk_count=sum(len(ids) for ids in chunk_ids.values())
+            ))
+            logger.info(f"Saved index manifest for corpus {self.corpus_version}")
+    
+    def _build_lexical_index(self):
+        """
+        Rebuild the BM25 index from the chunks currently in the collection
+        
+        Built from the collection rather than from the files so it always holds
+        exactly the chunks the vector index holds, including on the manifest fast path.
+        """
+        start = time.perf_counter()
+        records = self.collection.get(include=["documents", "metadatas"])
+        self.lexical_index.build(records["ids"], records["documents"], records["metadatas"])
+        logger.info(
+            f"Built BM25 index over {len(self.lexical_index)} chunks "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+    
+    def _count_module_chunks(self):
+        """Count the chunks tagged with each module, for scoped retrieval and its fallback"""
+        self.module_chunk_counts = {
+            slug: len(self.collection.get(where={module_field(slug): True}, include=[])["ids"])
+            for slug in self.module_tagger.modules
+        }
+        if self.module_chunk_counts:
+            logger.info(f"Chunks per module: {self.module_chunk_counts}")
+    
+    def _chunk_file(self, doc_file: Path) -> List[Dict[str, Any]]:
+        """
+        Stream and chunk a single documentation file with the loader and chunker for its type
+        
+        Args:
+            doc_file: File to chunk
             
-            # Create embeddings
-            for idx, chunk in enumerate(chunks):
-                chunk_id = f"{doc_file.stem}_{idx}"
-                embedding = self.embedding_model.encode(chunk).tolist()
-                
-                all_chunks.append(chunk)
-                all_embeddings.append(embedding)
-                all_metadatas.append({
-                    "source": doc_file.name,
-                    "chunk_id": chunk_id,
-                    "client": self.client
-                })
-                all_ids.append(chunk_id)
-        
-        # Add to ChromaDB
-        if all_chunks:
-            self.collection.add(
-                documents=all_chunks,
-                embeddings=all_embeddings,
-                metadatas=all_metadatas,
-                ids=all_ids
+        Returns:
+            List of chunks with text and section metadata
+        """
+        chunks = chunk_file(doc_file, self.chunk_size, self.chunk_overlap)
+        for chunk in chunks:
+            chunk["metadata"].update(
+                self.module_tagger.tags(chunk["text"], dict(chunk["metadata"], source=doc_file.name))
             )
-            logger.info(f"Added {len(all_chunks)} chunks to vector database")
+        return chunks
     
-    def _chunk_document(self, content: str) -> List[str]:
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
         """
-        Split document into overlapping chunks
+        Embed document chunks in batches
+        
+        All chunks go through a single encode call, which already orders them by
+        length so each batch pads to a similar size.
         
         Args:
-            content: Document content
+            texts: Chunk texts
             
         Returns:
-            List of text chunks
+            List of embedding vectors
         """
-        # Simple character-based chunking
-        chunks = []
-        start = 0
+        if not texts:
+            return []
+        
+        start = time.perf_counter()
+        vectors = self.embedding_model.encode(
+            texts,
+            batch_size=self.embedding_batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        elapsed = time.perf_counter() - start
         
-        while start < len(content):
-            end = start + self.chunk_size
-            chunk = content[start:end]
-            
-            # Try to break at sentence boundary
-            if end < len(content):
-                last_period = chunk.rfind('.')
-                last_newline = chunk.rfind('\n')
-                break_point = max(last_period, last_newline)
-                
-                if break_point > 0:
-                    chunk = chunk[:break_point + 1]
-                    end = start + break_point + 1
-            
-            chunks.append(chunk.strip())
-            start = end - self.chunk_overlap
+        embeddings = vectors.tolist()
         
-        return [c for c in chunks if c]  # Remove empty chunks
+        logger.info(
+            f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+            f"({len(texts) / max(elapsed, 1e-6):.1f} chunks/s, batch size {self.embedding_batch_size})"
+        )
+        return embeddings
     
-    async def retrieve(self, query: str, n_results: Optional[int] = None) -> List[Dict[str, Any]]:
+    async def retrieve(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        module: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant document chunks for a query
         
+        The query is embedded through the micro-batching embedder, and both the
+        embedding and the vector search run on the bounded retrieval executor so
+        a slow query never blocks the event loop. With hybrid retrieval enabled the
+        dense results are fused with BM25 results (see _hybrid_search_sync). With
+        re-ranking enabled, RERANK_CANDIDATES candidates are fetched and the
+        cross-encoder keeps the best n_results, unless scoring them would overrun
+        RERANK_BUDGET_MS from the start of the call. Finally, duplicates are dropped
+        and the remaining pool is diversified with maximal marginal relevance.
+        
+        When a configured module is given, the search is restricted to chunks
+        tagged with it at index time. If no chunk carries the tag, or the scoped
+        search comes back empty, retrieval falls back to the whole corpus.
+        
         Args:
             query: User's query
             n_results: Number of results to return (default: self.max_results)
+            module: Client-selected module to scope the search to
             
         Returns:
             List of relevant document chunks with metadata
+            
+        Raises:
+            ExecutorOverloaded: If the retrieval queue is full
         """
         if n_results is None:
             n_results = self.max_results
         
-        # Create query embedding
-        query_embedding = self.embedding_model.encode(query).tolist()
+        deadline = time.monotonic() + self.rerank_budget_ms / 1000
+        candidates = n_results
+        if self.reranker:
+            candidates = max(candidates, self.rerank_candidates)
+        if self.diversify_enabled:
+            candidates = max(candidates, self.mmr_candidates)
+        
+        query_embedding = await self.embed_query(query)
+        slug = self.module_tagger.resolve(module)
+        module_chunks = self.module_chunk_counts.get(slug, 0) if slug else 0
+        retrieved_docs = []
+        if module_chunks:
+            retrieved_docs = await self._first_stage(
+                query, query_embedding, candidates, {module_field(slug): True}, module_chunks
+            )
+        if not retrieved_docs:
+            if module and not slug:
+                logger.warning(f"Unknown module {module!r}, searching all documents")
+            elif slug and not module_chunks:
+                logger.info(f"No chunks tagged for module {slug!r}, searching all documents")
+            elif slug:
+                logger.info(f"No results within module {slug!r}, searching all documents")
+            retrieved_docs = await self._first_stage(query, query_embedding, candidates)
+        
+        if self.reranker:
+            # Keep the whole pool for MMR to choose from when diversifying
+            keep = len(retrieved_docs) if self.diversify_enabled else n_results
+            retrieved_docs = await self.retrieval_executor.run(
+                self.reranker.rerank, query, retrieved_docs, keep, self.rerank_min_score, deadline
+            )
+        
+        if self.diversify_enabled:
+            retrieved_docs = await self.retrieval_executor.run(
+                self._diversify_sync, query_embedding, retrieved_docs, n_results
+            )
+        retrieved_docs = [
+            {key: value for key, value in doc.items() if key != "embedding"}
+            for doc in retrieved_docs[:n_results]
+        ]
+        
+        logger.info(f"Retrieved {len(retrieved_docs)} relevant chunks for query: {query[:50]}...")
+        return retrieved_docs
+    
+    async def _first_stage(
+        self,
+        query: str,
+        query_embedding: List[float],
+        candidates: int,
+        where: Optional[Dict[str, Any]] = None,
+        max_dense: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the dense (or hybrid) candidate search on the retrieval executor
+        
+        Args:
+            query: User's query
+            query_embedding: Query embedding vector
+            candidates: Number of candidates to fetch
+            where: Metadata filter restricting the search
+            max_dense: Number of chunks matching the filter
+            
+        Returns:
+            Candidate chunks, best first
+        """
+        if self.hybrid_enabled and len(self.lexical_index):
+            return await self.retrieval_executor.run(
+                self._hybrid_search_sync, query, query_embedding, candidates, where, max_dense
+            )
+        if max_dense:
+            candidates = min(candidates, max_dense)
+        return await self.retrieval_executor.run(self._search_sync, query_embedding, candidates, where)
+    
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query, served from the query cache when possible and batched
+        with concurrent queries otherwise
+        
+        The original text is embedded; the normalized form is only the cache key,
+        and keeps case unless the embedding model is uncased.
         
-        # Search in ChromaDB
+        Args:
+            query: Query text
+            
+        Returns:
+            Query embedding vector
+        """
+        cache_key = normalize_query(query, lowercase=self.embedding_lowercase)
+        embedding = self.query_cache.get(cache_key)
+        if embedding is None:
+            embedding = await self.query_embedder.embed(query)
+            self.query_cache.set(cache_key, embedding)
+        return embedding
+    
+    def _encode_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Blocking batch encode of query texts, executed on a worker thread
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        return self.embedding_model.encode(
+            queries,
+            batch_size=len(queries),
+            show_progress_bar=False,
+            convert_to_numpy=True
+        ).tolist()
+    
+    def _search_sync(
+        self,
+        query_embedding: List[float],
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Blocking vector search, executed on a worker thread
+        
+        Args:
+            query_embedding: Query embedding vector
+            n_results: Number of results to return
+            where: Chroma metadata filter restricting the searched chunks
+            
+        Returns:
+            List of relevant document chunks with metadata
+        """
+        # Search in ChromaDB (embeddings are only needed for diversification)
+        include = ["documents", "metadatas", "distances"]
+        if self.diversify_enabled:
+            include.append("embeddings")
         results = self.collection.query(
             query_embeddings=[query_embedding],
-            n_results=n_results
+            n_results=n_results,
+            where=where,
+            include=include
         )
         
         # Format results
@@ -223,14 +653,122 @@ class RAGEngine:
         if results and results['documents']:
             for idx, doc in enumerate(results['documents'][0]):
                 retrieved_docs.append({
+                    "id": results['ids'][0][idx],
                     "content": doc,
                     "metadata": results['metadatas'][0][idx],
-                    "distance": results['distances'][0][idx] if 'distances' in results else None
+                    "distance": results['distances'][0][idx] if 'distances' in results else None,
+                    "embedding": results['embeddings'][0][idx] if results.get('embeddings') else None
                 })
         
-        logger.info(f"Retrieved {len(retrieved_docs)} relevant chunks for query: {query[:50]}...")
         return retrieved_docs
     
+    def _hybrid_search_sync(
+        self,
+        query: str,
+        query_embedding: List[float],
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None,
+        max_dense: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Blocking dense + BM25 search fused by reciprocal rank, executed on a worker thread
+        
+        Exact identifiers (class and function names, file names, column names)
+        that embed poorly are still found by the lexical side.
+        
+        Args:
+            query: Query text
+            query_embedding: Query embedding vector
+            n_results: Number of results to return
+            where: Metadata filter applied to both searches
+            max_dense: Upper bound on dense candidates (chunks matching the filter)
+            
+        Returns:
+            List of relevant document chunks with metadata and fused score
+        """
+        candidates = max(n_results, self.hybrid_candidates)
+        dense_candidates = min(candidates, max_dense) if max_dense else candidates
+        dense = self._search_sync(query_embedding, dense_candidates, where)
+        lexical = self.lexical_index.search(query, candidates, where)
+        
+        fused = reciprocal_rank_fusion(
+            [
+                ([doc["id"] for doc in dense], self.hybrid_dense_weight),
+                ([doc_id for doc_id, _ in lexical], self.hybrid_lexical_weight)
+            ],
+            k=self.rrf_k
+        )
+        
+        dense_by_id = {doc["id"]: doc for doc in dense}
+        lexical_scores = dict(lexical)
+        retrieved_docs = []
+        for doc_id, score in fused[:n_results]:
+            doc = dense_by_id.get(doc_id)
+            if doc is None:
+                stored = self.lexical_index.document(doc_id)
+                if stored is None:
+                    continue
+                doc = {"id": doc_id, "content": stored[0], "metadata": stored[1], "distance": None}
+            retrieved_docs.append(dict(
+                doc,
+                score=round(score, 6),
+                lexical_score=round(lexical_scores[doc_id], 4) if doc_id in lexical_scores else None
+            ))
+        
+        return retrieved_docs
+    
+    def _diversify_sync(
+        self,
+        query_embedding: List[float],
+        docs: List[Dict[str, Any]],
+        n_results: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Blocking duplicate suppression and MMR selection, executed on a worker thread
+        
+        Uses the embeddings returned by the vector search; lexical-only hits have
+        theirs fetched from the collection. Relevance is the cross-encoder score
+        when re-ranking ran, else the fused BM25 + dense score when the pool came
+        from hybrid search (both min-max scaled), so lexical-only identifier hits
+        keep their rank. Cosine similarity to the query is used only for pools
+        from dense search alone.
+        
+        Args:
+            query_embedding: Query embedding vector
+            docs: Candidates in rank order
+            n_results: Number of chunks to select
+            
+        Returns:
+            Selected chunks in MMR selection order
+        """
+        if len(docs) <= 1:
+            return docs
+        
+        missing = [doc["id"] for doc in docs if doc.get("embedding") is None]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["embeddings"])
+            by_id = dict(zip(fetched["ids"], fetched["embeddings"]))
+            docs = [dict(doc, embedding=by_id[doc["id"]]) if doc["id"] in by_id else doc for doc in docs]
+            docs = [doc for doc in docs if doc.get("embedding") is not None]
+        
+        embeddings = np.asarray([doc["embedding"] for doc in docs], dtype=np.float32)
+        kept = suppress_duplicates(docs, embeddings, self.duplicate_threshold)
+        if len(kept) < len(docs):
+            logger.debug(f"Suppressed {len(docs) - len(kept)} duplicate chunks")
+        
+        relevance = None
+        for key in ("rerank_score", "score"):
+            scores = [docs[idx].get(key) for idx in kept]
+            if all(score is not None for score in scores):
+                low, high = min(scores), max(scores)
+                relevance = [(score - low) / (high - low) if high > low else 1.0 for score in scores]
+                break
+        
+        selected = maximal_marginal_relevance(
+            query_embedding, embeddings[kept], n_results, self.mmr_lambda, relevance
+        )
+        return [docs[kept[idx]] for idx in selected]
+    
     async def generate_response(
         self,
         query: str,
@@ -250,64 +788,125 @@ class RAGEngine:
         Returns:
             Dict with response and metadata
         """
-        # Build context string
-        context_str = "\n\n".join([f"Source: {doc['metadata']['source']}\n{doc['content']}" for doc in context])
+        prompt = self.build_prompt(query, context, conversation_history, mode)
+        llm_usage = None
         
-        # Build system prompt
-        system_prompt = self._build_system_prompt(mode)
-        
-        # Build conversation messages
-        messages = []
-        
-        # Add conversation history if available
-        if conversation_history:
-            for msg in conversation_history[-5:]:  # Last 5 messages for context
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        
-        # Add current query with context
-        user_message = f"""Context from documentation:
-{context_str}
-
-User question: {query}
-
-Please provide a clear, technical response based on the documentation above."""
-
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
-        
-        # Generate response with Claude
-        if self.llm_provider == "anthropic":
-            response = self.anthropic_client.messages.create(
-                model=self.llm_model,
-                max_tokens=int(os.getenv("LLM_MAX_TOKENS", 2000)),
-                temperature=float(os.getenv("LLM_TEMPERATURE", 0.7)),
-                system=system_prompt,
-                messages=messages
-            )
+        # Generate response with Claude (or the offline stub)
+        if self.llm_client:
+            async with self.llm_semaphore:
+                response = await self.llm_client.messages.create(**prompt["request"])
             
             response_text = response.content[0].text
+            llm_usage = self._record_usage(response.usage)
         else:
             # Fallback if other providers added later
             response_text = "LLM provider not configured"
         
-        # Extract sources
-        sources = [{"source": doc["metadata"]["source"]} for doc in context]
-        
         return {
             "response": response_text,
-            "sources": sources,
-            "mode": mode
+            "sources": self.format_sources(prompt["context"]),
+            "mode": mode,
+            "prompt_tokens": prompt["usage"],
+            "llm_usage": llm_usage
         }
     
+    async def stream_response(
+        self,
+        query: str,
+        context: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        mode: str = "full_overview",
+        prompt: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream response text deltas from the LLM
+        
+        Args:
+            query: User's query
+            context: Retrieved document chunks
+            conversation_history: Previous conversation messages
+            mode: Conversation mode
+            prompt: Prompt already assembled by build_prompt (built here when omitted)
+            
+        Yields:
+            Text deltas in generation order
+        """
+        if prompt is None:
+            prompt = self.build_prompt(query, context, conversation_history, mode)
+        
+        if self.llm_client:
+            async with self.llm_semaphore:
+                async with self.llm_client.messages.stream(**prompt["request"]) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+                    final_message = await stream.get_final_message()
+            self._record_usage(final_message.usage)
+        else:
+            yield "LLM provider not configured"
+    
+    def format_sources(self, context: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract source references from retrieved chunks
+        
+        Args:
+            context: Retrieved document chunks
+            
+        Returns:
+            List of source dicts
+        """
+        sources = []
+        for doc in context:
+            source = {"source": doc["metadata"]["source"]}
+            if doc["metadata"].get("section"):
+                source["section"] = doc["metadata"]["section"]
+            sources.append(source)
+        return sources
+    
+    def build_prompt(
+        self,
+        query: str,
+        context: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]],
+        mode: str
+    ) -> Dict[str, Any]:
+        """
+        Assemble the LLM request within the input token budget
+        
+        Args:
+            query: User's query
+            context: Retrieved document chunks, best first
+            conversation_history: Previous conversation messages
+            mode: Conversation mode
+            
+        Returns:
+            Dict with "request" (keyword arguments for messages.create / messages.stream),
+            "context" (chunks that fit the budget) and "usage" (token counts)
+        """
+        prompt = self.prompt_builder.build(self._system_prompt(mode), query, context, conversation_history)
+        usage = prompt["usage"]
+        logger.info(
+            f"Prompt: {usage['input_tokens']}/{usage['budget']} input tokens "
+            f"(system {usage['system_tokens']}, history {usage['history_tokens']}, context {usage['context_tokens']}; "
+            f"{usage['context_chunks']} chunks, {usage['context_chunks_dropped']} dropped, "
+            f"{usage['context_chunks_truncated']} truncated)"
+        )
+        
+        prompt["request"] = build_request(
+            prompt,
+            model=self.llm_model,
+            max_tokens=int(os.getenv("LLM_MAX_TOKENS", 2000)),
+            temperature=float(os.getenv("LLM_TEMPERATURE", 0.7)),
+            prompt_caching=self.prompt_caching
+        )
+        return prompt
+    
     def _build_system_prompt(self, mode: str) -> str:
         """
         Build system prompt based on conversation mode
         
+        Called once per mode by _prepare_system_prompts; the result must stay
+        byte-identical between calls for the provider's prompt cache to hit.
+        
         Args:
             mode: Conversation mode
             
@@ -323,6 +922,15 @@ Please provide a clear, technical response based on the documentation above."""
         
         modules_str = ', '.join(module_names) if module_names else 'various topics'
         
+        # Module catalogue with descriptions, when the config provides them
+        catalogue = [
+            f"- {m['name']}: {m['description']}"
+            for m in modules
+            if isinstance(m, dict) and m.get('name') and m.get('description')
+        ]
+        if catalogue:
+            modules_str += "\n\nModule catalogue:\n" + "\n".join(catalogue)
+        
         base_prompt = f"""You are a technical documentation assistant for {self.config.get('client_name', self.client)}.
 
 Your role is to provide accurate, clear explanations of technical workflows and system capabilities.
@@ -366,4 +974,6 @@ When explaining workflows:
     async def cleanup(self):
         """Cleanup resources"""
         logger.info("Cleaning up RAG engine resources...")
-        # Add any cleanup logic here
\ No newline at end of file
+        self.retrieval_executor.shutdown()
+        if self.llm_client:
+            await self.llm_client.close()
\ No newline at end of file
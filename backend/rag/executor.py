@@ -0,0 +1,82 @@
+"""
+Bounded executor for blocking RAG work
+Runs CPU-bound embedding and vector search off the event loop with a capped backlog
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorOverloaded(RuntimeError):
+    """Raised when a bounded executor's queue is full"""
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a fixed number of workers and a bounded waiting queue
+
+    A thread pool is used rather than a process pool because the embedding model
+    and the Chroma client are shared, in-process objects; both release the GIL
+    during the heavy numeric work.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Initialize executor
+
+        Args:
+            name: Name used for worker threads and stats
+            max_workers: Number of worker threads (concurrent jobs)
+            max_queue: Number of jobs allowed to wait for a free worker
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool
+
+        Args:
+            fn: Callable to execute
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Result of fn
+
+        Raises:
+            ExecutorOverloaded: If all workers are busy and the queue is full
+        """
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise ExecutorOverloaded(f"{self.name} executor is saturated ({self._in_flight} jobs pending)")
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get current executor statistics"""
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+    def shutdown(self):
+        """Stop accepting work and release worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,233 @@
+"""
+Document file-type registry
+Selects corpus files by include/exclude patterns and maps each file type to a loader and a chunker
+"""
+
+import fnmatch
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from loguru import logger
+
+from rag.chunking import (
+    Chunk,
+    ChunkFn,
+    chunk_csv,
+    chunk_markdown,
+    chunk_plain,
+    chunk_python,
+    chunk_yaml,
+)
+
+# Text files are read in segments of about this many characters, cut at a blank line or newline
+STREAM_SEGMENT_CHARS = 256 * 1024
+
+# Used when the client config has no "indexing" section
+DEFAULT_INCLUDE = ["*.md", "*.markdown", "*.py", "*.yml", "*.yaml", "*.csv", "*.txt", "LICENSE*"]
+DEFAULT_EXCLUDE = [".*", "ingestion_metadata.json"]
+DEFAULT_MAX_FILE_SIZE_MB = 50
+
+
+def read_whole(path: Path) -> Iterator[str]:
+    """
+    Load a file as a single segment
+
+    For formats whose structure only parses as a whole (Python source).
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        yield f.read()
+
+
+def read_segments(path: Path, segment_chars: int = STREAM_SEGMENT_CHARS) -> Iterator[str]:
+    """
+    Stream a text file in bounded segments
+
+    Each segment ends at the last paragraph break (or line break) before the
+    size limit, so no paragraph is split between segments unless it alone
+    exceeds the limit. Files smaller than one segment yield their full content.
+
+    Args:
+        path: File to read
+        segment_chars: Approximate maximum characters per segment
+
+    Yields:
+        Text segments in file order
+    """
+    buffer = ""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for block in iter(lambda: f.read(segment_chars), ''):
+            buffer += block
+            if len(buffer) < segment_chars:
+                continue
+            cut = buffer.rfind("\n\n")
+            if cut <= 0:
+                cut = buffer.rfind("\n")
+            if cut <= 0:
+                cut = len(buffer)
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer
+
+
+def read_lines(path: Path) -> Iterator[Any]:
+    """
+    Load a file as a single segment that is an iterator over its lines
+
+    For chunkers that consume rows one at a time (CSV).
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        yield f
+
+
+# File type name -> {"patterns", "loader", "chunker", "stateful"}; first matching type wins.
+# Stateful chunkers also get a state dict shared by all segments of a file (state=...)
+FILE_TYPES: Dict[str, Dict[str, Any]] = {
+    "markdown": {"patterns": ["*.md", "*.markdown"], "loader": read_segments, "chunker": chunk_markdown, "stateful": True},
+    "python": {"patterns": ["*.py"], "loader": read_whole, "chunker": chunk_python},
+    "yaml": {"patterns": ["*.yml", "*.yaml"], "loader": read_segments, "chunker": chunk_yaml},
+    "csv": {"patterns": ["*.csv"], "loader": read_lines, "chunker": chunk_csv},
+    "text": {"patterns": ["*"], "loader": read_segments, "chunker": chunk_plain},
+}
+
+
+def register_file_type(
+    name: str,
+    patterns: Sequence[str],
+    chunker: ChunkFn,
+    loader: Callable[[Path], Iterator[Any]] = read_segments,
+    stateful: bool = False
+):
+    """
+    Register (or replace) a file type, checked before the built-in types
+
+    Args:
+        name: File type name
+        patterns: File name glob patterns (e.g. ["*.rst"])
+        chunker: Callable taking (segment, chunk_size, chunk_overlap) and returning chunks
+        loader: Callable taking a path and yielding segments for the chunker
+        stateful: Pass the chunker a state dict (keyword state) shared across a file's segments
+    """
+    entry = {"patterns": list(patterns), "loader": loader, "chunker": chunker, "stateful": stateful}
+    others = [(key, value) for key, value in FILE_TYPES.items() if key != name]
+    FILE_TYPES.clear()
+    FILE_TYPES.update([(name, entry)] + others)
+
+
+def file_type_for(path: Path) -> str:
+    """
+    Get the registered file type of a file
+
+    Args:
+        path: File path
+
+    Returns:
+        File type name (plain "text" when no specific type matches)
+    """
+    for name, entry in FILE_TYPES.items():
+        if any(fnmatch.fnmatch(path.name, pattern) for pattern in entry["patterns"]):
+            return name
+    return "text"
+
+
+def chunk_file(path: Path, chunk_size: int, chunk_overlap: int) -> List[Chunk]:
+    """
+    Load and chunk a file with the loader and chunker of its type
+
+    Args:
+        path: File to chunk
+        chunk_size: Target maximum characters per chunk
+        chunk_overlap: Overlap for text splitting
+
+    Returns:
+        List of chunks, each tagged with its file_type
+    """
+    file_type = file_type_for(path)
+    entry = FILE_TYPES[file_type]
+
+    # Lets a chunker continue across segment boundaries (e.g. Markdown's open headings)
+    options = {"state": {}} if entry.get("stateful") else {}
+    chunks = []
+    for segment in entry["loader"](path):
+        for chunk in entry["chunker"](segment, chunk_size, chunk_overlap, **options):
+            chunk["metadata"]["file_type"] = file_type
+            chunks.append(chunk)
+    return chunks
+
+
+class CorpusSelector:
+    """
+    Chooses which files of a documentation directory are indexed
+
+    A file is indexed when its name matches an include pattern, matches no
+    exclude pattern and is not larger than the size limit.
+    """
+
+    def __init__(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        max_file_size_mb: Optional[float] = None
+    ):
+        """
+        Initialize selector
+
+        Args:
+            include: File name glob patterns to index
+            exclude: File name glob patterns to skip
+            max_file_size_mb: Files above this size are skipped (0 for no limit)
+        """
+        self.include = list(include) if include is not None else list(DEFAULT_INCLUDE)
+        self.exclude = list(exclude) if exclude is not None else list(DEFAULT_EXCLUDE)
+        size_mb = DEFAULT_MAX_FILE_SIZE_MB if max_file_size_mb is None else max_file_size_mb
+        self.max_file_size = int(size_mb * 1024 * 1024) if size_mb else None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CorpusSelector":
+        """
+        Build a selector from the "indexing" section of a client config
+
+        Args:
+            config: Client configuration
+
+        Returns:
+            Corpus selector
+        """
+        indexing = config.get("indexing") or {}
+        return cls(
+            include=indexing.get("include"),
+            exclude=indexing.get("exclude"),
+            max_file_size_mb=indexing.get("max_file_size_mb")
+        )
+
+    def select(self, docs_path: Path) -> List[Path]:
+        """
+        List the files of a documentation directory to index
+
+        Args:
+            docs_path: Documentation directory
+
+        Returns:
+            Selected files, sorted by name
+        """
+        selected = []
+        for path in sorted(docs_path.iterdir()):
+            if not path.is_file():
+                continue
+            name = path.name
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in self.include):
+                continue
+            if any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude):
+                continue
+            if self.max_file_size and path.stat().st_size > self.max_file_size:
+                logger.warning(f"Skipping {name}: larger than {self.max_file_size // (1024 * 1024)} MB")
+                continue
+            selected.append(path)
+        return selected
+
+    def settings(self) -> Dict[str, Any]:
+        """Selection settings, for logs and the health endpoint"""
+        return {
+            "include": self.include,
+            "exclude": self.exclude,
+            "max_file_size_mb": self.max_file_size / (1024 * 1024) if self.max_file_size else None
+        }
@@ -0,0 +1,206 @@
+"""
+Incremental document indexer
+Embeds only new or changed chunks and removes chunks whose source content is gone
+"""
+
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Tuple
+from loguru import logger
+
+# Upper bound on records per collection.add call (ChromaDB rejects oversized batches)
+ADD_BATCH_SIZE = 1000
+
+
+def chunk_id_for(source: str, chunk: str, seen: Dict[str, int]) -> str:
+    """
+    Build a content-addressed chunk ID
+
+    Identical chunks within one file get an occurrence suffix so IDs stay unique.
+
+    Args:
+        source: Source file name
+        chunk: Chunk text
+        seen: Occurrence counter shared across the chunks of one file
+
+    Returns:
+        Stable chunk ID
+    """
+    chunk_hash = hashlib.sha256(f"{source}\0{chunk}".encode('utf-8')).hexdigest()[:16]
+    occurrence = seen.get(chunk_hash, 0)
+    seen[chunk_hash] = occurrence + 1
+    return f"{source}:{chunk_hash}" if occurrence == 0 else f"{source}:{chunk_hash}:{occurrence}"
+
+
+class IncrementalIndexer:
+    """
+    Synchronizes a vector collection with the files of a documentation corpus
+
+    Files whose content hash matches the previous manifest are skipped without
+    being read. Changed files are re-chunked and only chunks with unseen IDs are
+    embedded; reused chunks whose metadata moved (line range, section, module
+    tags) are rewritten with their stored embedding, and chunk IDs that no
+    longer belong to any file are deleted.
+    """
+
+    def __init__(
+        self,
+        collection,
+        chunk_fn: Callable[[Path], List[Dict[str, Any]]],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        client: str
+    ):
+        """
+        Initialize indexer
+
+        Args:
+            collection: ChromaDB collection to synchronize
+            chunk_fn: Reads a file and returns its chunks ({"text", "metadata"} dicts)
+            embed_fn: Embeds a list of texts
+            client: Client name stored in chunk metadata
+        """
+        self.collection = collection
+        self.chunk_fn = chunk_fn
+        self.embed_fn = embed_fn
+        self.client = client
+
+    def run(
+        self,
+        file_hashes: Dict[str, str],
+        doc_paths: Dict[str, Path],
+        previous: Dict[str, Any]
+    ) -> Tuple[Dict[str, List[str]], Dict[str, Any]]:
+        """
+        Bring the collection in line with the current corpus
+
+        Args:
+            file_hashes: Mapping of file name to current content hash
+            doc_paths: Mapping of file name to path on disk
+            previous: Previous manifest data (empty for a fresh index)
+
+        Returns:
+            Tuple of (chunk IDs per file, change report)
+        """
+        previous_hashes = previous.get("files", {})
+        previous_chunks = previous.get("chunks", {})
+
+        report = {
+            "files_added": [],
+            "files_changed": [],
+            "files_removed": [],
+            "files_unchanged": 0,
+            "chunks_added": 0,
+            "chunks_deleted": 0,
+            "chunks_reused": 0,
+            "chunks_refreshed": 0
+        }
+
+        # Chunks recorded in the manifest but missing from the collection force a re-read
+        expected_ids = [cid for name in file_hashes for cid in previous_chunks.get(name, [])]
+        present_ids = set(self.collection.get(ids=expected_ids, include=[])["ids"]) if expected_ids else set()
+
+        chunk_ids: Dict[str, List[str]] = {}
+        new_documents: List[str] = []
+        new_metadatas: List[Dict[str, Any]] = []
+        new_ids: List[str] = []
+        reused_metadatas: Dict[str, Dict[str, Any]] = {}
+
+        for name, file_hash in file_hashes.items():
+            known_ids = previous_chunks.get(name)
+            if (
+                previous_hashes.get(name) == file_hash
+                and known_ids is not None
+                and all(cid in present_ids for cid in known_ids)
+            ):
+                chunk_ids[name] = known_ids
+                report["files_unchanged"] += 1
+                report["chunks_reused"] += len(known_ids)
+                continue
+
+            report["files_changed" if name in previous_hashes else "files_added"].append(name)
+            logger.info(f"Processing {name}...")
+
+            seen: Dict[str, int] = {}
+            ids = []
+            for chunk in self.chunk_fn(doc_paths[name]):
+                cid = chunk_id_for(name, chunk["text"], seen)
+                ids.append(cid)
+                metadata = dict(chunk.get("metadata", {}), source=name, chunk_id=cid, client=self.client)
+                if cid in present_ids:
+                    report["chunks_reused"] += 1
+                    reused_metadatas[cid] = metadata
+                    continue
+                new_documents.append(chunk["text"])
+                new_ids.append(cid)
+                new_metadatas.append(metadata)
+            chunk_ids[name] = ids
+
+        # The ID only covers the text, so a reused chunk may have moved or been retagged.
+        # Metadata updates merge keys rather than replace them, so stale chunks are
+        # deleted and re-added with their stored embedding instead of re-embedded.
+        refreshed_documents: List[str] = []
+        refreshed_embeddings: List[List[float]] = []
+        refreshed_metadatas: List[Dict[str, Any]] = []
+        refreshed_ids: List[str] = []
+        if reused_metadatas:
+            stored = self.collection.get(
+                ids=list(reused_metadatas), include=["documents", "metadatas", "embeddings"]
+            )
+            for cid, document, metadata, embedding in zip(
+                stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+            ):
+                if metadata != reused_metadatas[cid]:
+                    refreshed_documents.append(document)
+                    refreshed_embeddings.append(list(embedding))
+                    refreshed_metadatas.append(reused_metadatas[cid])
+                    refreshed_ids.append(cid)
+
+        # Delete chunks of removed files and chunks that changed files no longer produce
+        report["files_removed"] = [name for name in previous_hashes if name not in file_hashes]
+        live_ids = {cid for ids in chunk_ids.values() for cid in ids}
+        orphan_ids = [
+            cid
+            for ids in previous_chunks.values()
+            for cid in ids
+            if cid not in live_ids
+        ]
+        if orphan_ids:
+            self.collection.delete(ids=orphan_ids)
+            report["chunks_deleted"] = len(orphan_ids)
+
+        if refreshed_ids:
+            self.collection.delete(ids=refreshed_ids)
+            self._add(refreshed_documents, refreshed_embeddings, refreshed_metadatas, refreshed_ids)
+            report["chunks_refreshed"] = len(refreshed_ids)
+
+        if new_documents:
+            # Embed every new chunk across all files in one batched pass
+            new_embeddings = self.embed_fn(new_documents)
+            self._add(new_documents, new_embeddings, new_metadatas, new_ids)
+            report["chunks_added"] = len(new_documents)
+
+        # Sweep chunks left behind by an interrupted run that never reached the manifest
+        if self.collection.count() != len(live_ids):
+            stray_ids = [cid for cid in self.collection.get(include=[])["ids"] if cid not in live_ids]
+            if stray_ids:
+                self.collection.delete(ids=stray_ids)
+                report["chunks_deleted"] += len(stray_ids)
+
+        return chunk_ids, report
+
+    def _add(
+        self,
+        documents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str]
+    ):
+        """Add records to the collection in batches of at most ADD_BATCH_SIZE"""
+        for start in range(0, len(documents), ADD_BATCH_SIZE):
+            end = start + ADD_BATCH_SIZE
+            self.collection.add(
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
@@ -0,0 +1,183 @@
+"""
+Lexical retrieval
+In-process BM25 inverted index and reciprocal rank fusion with dense results
+"""
+
+import re
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Identifier-like tokens: dotted/underscored/hyphenated names, file names, numbers
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+(?:[.\-/][A-Za-z0-9_]+)*")
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase lexical terms
+
+    Compound identifiers are kept whole and also split into their parts, so
+    "RADPClient.train" matches both the exact identifier and "radp", "client"
+    or "train" on their own.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms (with repeats, in order)
+    """
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group(0)
+        terms.append(token.lower())
+
+        parts = [p for p in re.split(r"[.\-/_]", token) if p]
+        if len(parts) > 1:
+            terms.extend(p.lower() for p in parts)
+        for part in parts:
+            words = CAMEL_BOUNDARY.split(part)
+            if len(words) > 1:
+                terms.extend(w.lower() for w in words if w)
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index of chunk terms
+
+    Holds the chunk text and metadata so lexical-only hits can be returned
+    without a round trip to the vector store. Safe to query from executor
+    threads while the index is rebuilt.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize index
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def build(self, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]):
+        """
+        Replace the index contents
+
+        Args:
+            ids: Chunk IDs
+            documents: Chunk texts
+            metadatas: Chunk metadata dicts
+        """
+        postings: Dict[str, Dict[str, int]] = {}
+        lengths: Dict[str, int] = {}
+        stored: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+        for doc_id, text, metadata in zip(ids, documents, metadatas):
+            terms = tokenize(text or "")
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, {})[doc_id] = count
+            lengths[doc_id] = len(terms)
+            stored[doc_id] = (text, metadata or {})
+
+        with self._lock:
+            self._postings = postings
+            self._lengths = lengths
+            self._documents = stored
+            self._total_length = sum(lengths.values())
+
+    def search(self, query: str, n_results: int, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """
+        Score chunks against a query
+
+        Args:
+            query: Query text
+            n_results: Maximum number of results
+            where: Metadata equality filter ({field: value}); only matching chunks are scored
+
+        Returns:
+            List of (chunk ID, BM25 score), best first
+        """
+        with self._lock:
+            postings = self._postings
+            lengths = self._lengths
+            total_length = self._total_length
+            documents = self._documents
+
+        doc_count = len(lengths)
+        if not doc_count or n_results <= 0:
+            return []
+        avg_length = total_length / doc_count
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            matches = postings.get(term)
+            if not matches:
+                continue
+            idf = math.log(1 + (doc_count - len(matches) + 0.5) / (len(matches) + 0.5))
+            for doc_id, tf in matches.items():
+                if where and any(documents[doc_id][1].get(key) != value for key, value in where.items()):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+    def document(self, doc_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Get the stored text and metadata of a chunk
+
+        Args:
+            doc_id: Chunk ID
+
+        Returns:
+            Tuple of (text, metadata) or None
+        """
+        return self._documents.get(doc_id)
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        return {
+            "documents": len(self._lengths),
+            "terms": len(self._postings),
+            "avg_document_length": round(self._total_length / len(self._lengths), 1) if self._lengths else 0.0,
+            "k1": self.k1,
+            "b": self.b
+        }
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Tuple[Sequence[str], float]],
+    k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked ID lists with weighted reciprocal rank fusion
+
+    Each list contributes weight / (k + rank) to every ID it contains.
+
+    Args:
+        rankings: Pairs of (IDs best first, weight)
+        k: Rank smoothing constant
+
+    Returns:
+        List of (ID, fused score), best first
+    """
+    scores: Dict[str, float] = {}
+    for ids, weight in rankings:
+        if weight <= 0:
+            continue
+        for rank, doc_id in enumerate(ids, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
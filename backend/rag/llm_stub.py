@@ -0,0 +1,146 @@
+"""
+Offline LLM provider
+Stand-in for the Anthropic async client that answers locally and simulates prompt caching
+"""
+
+import json
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List
+
+
+def _estimate_tokens(value: Any) -> int:
+    """Rough token count (4 characters per token) of a text or content structure"""
+    text = value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    return (len(text) + 3) // 4
+
+
+class _Usage:
+    def __init__(self, input_tokens: int, output_tokens: int, cache_read: int, cache_creation: int):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_read_input_tokens = cache_read
+        self.cache_creation_input_tokens = cache_creation
+
+
+class _TextBlock:
+    def __init__(self, text: str):
+        self.type = "text"
+        self.text = text
+
+
+class _Message:
+    def __init__(self, text: str, usage: _Usage, model: str):
+        self.content = [_TextBlock(text)]
+        self.usage = usage
+        self.model = model
+        self.stop_reason = "end_turn"
+
+
+class _MessageStream:
+    """Async context manager mirroring the SDK's MessageStream (text_stream, get_final_message)"""
+
+    def __init__(self, message: _Message, delay: float):
+        self._message = message
+        self._delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        for word in self._message.content[0].text.split(" "):
+            if self._delay:
+                await asyncio.sleep(self._delay)
+            yield word + " "
+
+    async def get_final_message(self) -> _Message:
+        return self._message
+
+
+class _Messages:
+    def __init__(self, client: "StubLLMClient"):
+        self._client = client
+
+    async def create(self, **request) -> _Message:
+        return self._client.respond(request)
+
+    def stream(self, **request) -> _MessageStream:
+        return _MessageStream(self._client.respond(request), self._client.token_delay)
+
+
+class StubLLMClient:
+    """
+    Deterministic local replacement for anthropic.AsyncAnthropic
+
+    Selected with LLM_PROVIDER=stub for development and tests without network
+    access or an API key. Replies summarize the prompt it was given. Content up
+    to each cache_control marker is remembered, so repeated prefixes report
+    cache_read_input_tokens and first sightings report
+    cache_creation_input_tokens, like the real API.
+    """
+
+    def __init__(self, token_delay_ms: float = 0):
+        """
+        Initialize stub
+
+        Args:
+            token_delay_ms: Delay between streamed words, to mimic generation speed
+        """
+        self.token_delay = token_delay_ms / 1000
+        self.messages = _Messages(self)
+        self._cached_prefixes = set()
+
+    def _prefix_blocks(self, request: Dict[str, Any]) -> List[Any]:
+        """Prompt content in cache order: system blocks, then message blocks"""
+        system = request.get("system") or []
+        blocks = [{"type": "text", "text": system}] if isinstance(system, str) else list(system)
+        for message in request.get("messages", []):
+            content = message["content"]
+            if isinstance(content, str):
+                blocks.append({"role": message["role"], "type": "text", "text": content})
+            else:
+                blocks.extend(dict(block, role=message["role"]) for block in content)
+        return blocks
+
+    def respond(self, request: Dict[str, Any]) -> _Message:
+        blocks = self._prefix_blocks(request)
+        total = sum(_estimate_tokens(block.get("text", "")) for block in blocks)
+
+        # Longest marked prefix seen before is a cache read; newer marked prefixes are written
+        cache_read = cache_creation = 0
+        prefix_tokens = 0
+        digest = hashlib.sha256()
+        for block in blocks:
+            digest.update(json.dumps({k: v for k, v in block.items() if k != "cache_control"}, sort_keys=True).encode('utf-8'))
+            prefix_tokens += _estimate_tokens(block.get("text", ""))
+            if block.get("cache_control"):
+                key = digest.hexdigest()
+                if key in self._cached_prefixes:
+                    cache_read = prefix_tokens
+                    cache_creation = 0
+                else:
+                    self._cached_prefixes.add(key)
+                    cache_creation = prefix_tokens - cache_read
+
+        question = blocks[-1].get("text", "") if blocks else ""
+        if "User question:" in question:
+            question = question.split("User question:", 1)[1].split("\n", 1)[0].strip()
+        text = (
+            f"[stub response] You asked: {question[:200]}. "
+            f"The prompt held {len(request.get('messages', []))} messages and about {total} input tokens."
+        )
+        usage = _Usage(
+            input_tokens=total - cache_read - cache_creation,
+            output_tokens=_estimate_tokens(text),
+            cache_read=cache_read,
+            cache_creation=cache_creation
+        )
+        return _Message(text, usage, request.get("model", "stub"))
+
+    async def close(self):
+        """Nothing to release"""
+        return None
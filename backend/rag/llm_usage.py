@@ -0,0 +1,51 @@
+"""
+LLM token accounting
+Running totals of input, output and prompt-cache tokens reported by the provider
+"""
+
+import threading
+from typing import Any, Dict
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+
+class LLMUsageTracker:
+    """
+    Accumulates the usage objects of LLM responses
+
+    input_tokens only counts uncached prompt tokens; cache reads and cache
+    writes are reported separately, so the prompt size of a request is the sum
+    of the three.
+    """
+
+    def __init__(self):
+        """Initialize tracker"""
+        self.totals = {"requests": 0, **{field: 0 for field in USAGE_FIELDS}}
+        self._lock = threading.Lock()
+
+    def record(self, usage: Any) -> Dict[str, int]:
+        """
+        Add the usage of one response to the totals
+
+        Args:
+            usage: Usage object of the response (missing fields count as 0)
+
+        Returns:
+            Token counts of this response
+        """
+        counts = {field: int(getattr(usage, field, 0) or 0) for field in USAGE_FIELDS}
+        with self._lock:
+            self.totals["requests"] += 1
+            for field, value in counts.items():
+                self.totals[field] += value
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the totals and the share of prompt tokens served from the cache"""
+        with self._lock:
+            totals = dict(self.totals)
+        prompt_tokens = totals["input_tokens"] + totals["cache_read_input_tokens"] + totals["cache_creation_input_tokens"]
+        return dict(
+            totals,
+            cache_read_ratio=round(totals["cache_read_input_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+        )
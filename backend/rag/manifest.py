@@ -0,0 +1,198 @@
+"""
+Corpus manifest for the persistent vector index
+Records what was embedded so an unchanged corpus can skip re-indexing on startup
+"""
+
+import os
+import json
+import fcntl
+import asyncio
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional
+from loguru import logger
+
+
+MANIFEST_VERSION = 2
+
+
+def hash_file(path: Path, block_size: int = 65536) -> str:
+    """
+    Compute the SHA-256 of a file without reading it into memory at once
+
+    Args:
+        path: File to hash
+        block_size: Read size in bytes
+
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CorpusManifest:
+    """
+    JSON manifest stored next to the persistent index
+
+    The manifest captures the index settings (embedding model, chunking) and a
+    content hash per source file. A corpus whose fingerprint matches the stored
+    manifest is already fully embedded.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize manifest
+
+        Args:
+            path: Location of the manifest file
+        """
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {}
+
+    @staticmethod
+    def build(settings: Dict[str, Any], files: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Build manifest data for the current corpus
+
+        Args:
+            settings: Index settings that invalidate all embeddings when changed
+            files: Mapping of source file name to content hash
+
+        Returns:
+            Manifest dict including the derived corpus version
+        """
+        fingerprint = hashlib.sha256(
+            json.dumps({"settings": settings, "files": files}, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+        return {
+            "manifest_version": MANIFEST_VERSION,
+            "corpus_version": fingerprint[:16],
+            "settings": settings,
+            "files": files
+        }
+
+    @staticmethod
+    def hash_files(doc_files: Iterable[Path]) -> Dict[str, str]:
+        """
+        Hash every source file of the corpus
+
+        Args:
+            doc_files: Source files to hash
+
+        Returns:
+            Mapping of file name to content hash
+        """
+        return {doc_file.name: hash_file(doc_file) for doc_file in sorted(doc_files)}
+
+    def load(self) -> Dict[str, Any]:
+        """Load manifest from disk, returning an empty dict if missing or unreadable"""
+        if not self.path.exists():
+            self.data = {}
+            return self.data
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable index manifest {self.path}: {e}")
+            self.data = {}
+
+        return self.data
+
+    def save(self, data: Dict[str, Any]):
+        """
+        Atomically write manifest to disk
+
+        Args:
+            data: Manifest data to persist
+        """
+        self.data = dict(data, updated_at=datetime.utcnow().isoformat())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        tmp_path.replace(self.path)
+
+    def compatible(self, settings: Dict[str, Any]) -> bool:
+        """
+        Check whether stored embeddings can be reused under the given settings
+
+        Args:
+            settings: Current index settings
+
+        Returns:
+            True if the index can be updated incrementally
+        """
+        return (
+            self.data.get("manifest_version") == MANIFEST_VERSION
+            and self.data.get("settings") == settings
+        )
+
+    def matches(self, current: Dict[str, Any], chunk_count: Optional[int] = None) -> bool:
+        """
+        Check whether the stored manifest describes the current corpus
+
+        Args:
+            current: Manifest data built for the current corpus
+            chunk_count: Number of chunks currently in the collection
+
+        Returns:
+            True if nothing needs to be embedded
+        """
+        if not self.compatible(current.get("settings")):
+            return False
+        if self.data.get("corpus_version") != current.get("corpus_version"):
+            return False
+        if chunk_count is not None and self.data.get("chunk_count") != chunk_count:
+            return False
+        return True
+
+
+class IndexLock:
+    """
+    Exclusive inter-process lock on a persistent index directory
+
+    Chroma's PersistentClient supports a single writing process, and several
+    workers share VECTOR_INDEX_DIR. Held from opening the index through the
+    manifest check, indexing and manifest save, so one worker builds the index
+    while the others wait and then open the finished result.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize lock
+
+        Args:
+            path: Lock file location (created if missing)
+        """
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    async def __aenter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Index is being built by another worker, waiting for {self.path}")
+            try:
+                await asyncio.to_thread(fcntl.flock, self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(self._fd)
+                self._fd = None
+                raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        return False
@@ -0,0 +1,120 @@
+"""
+Module tagging
+Tags chunks with the client's documentation modules so retrieval can be scoped to one module
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+
+def module_slug(name: str) -> str:
+    """
+    Build the metadata-safe identifier of a module name
+
+    Args:
+        name: Module name from the client config
+
+    Returns:
+        Lowercase slug, e.g. "Coverage & Capacity Optimization" -> "coverage_capacity_optimization"
+    """
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def module_field(slug: str) -> str:
+    """Chunk metadata key flagging membership in a module"""
+    return f"module_{slug}"
+
+
+class ModuleTagger:
+    """
+    Keyword classifier mapping chunks to the modules defined in config.json
+
+    A chunk belongs to every module whose name or keywords occur in its text,
+    section or source file name (whole-word, case-insensitive). Membership is
+    stored as boolean metadata fields (module_<slug>: True) that a vector-store
+    where filter can select on.
+    """
+
+    def __init__(self, modules: List[Any]):
+        """
+        Initialize tagger
+
+        Args:
+            modules: The config's "modules" list (dicts with name/keywords, or plain names)
+        """
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        for module in modules or []:
+            if isinstance(module, dict):
+                name = module.get("name", "")
+                keywords = module.get("keywords", [])
+            else:
+                name, keywords = str(module), []
+            slug = module_slug(name)
+            if not slug:
+                continue
+            terms = sorted({term.lower().strip() for term in [name, *keywords] if term and term.strip()})
+            self.modules[slug] = {
+                "name": name,
+                "keywords": terms,
+                "pattern": re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE)
+            }
+
+    def tags(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+        """
+        Classify a chunk
+
+        Args:
+            text: Chunk text
+            metadata: Chunk metadata (section and source are matched too)
+
+        Returns:
+            Metadata fields to add, one module_<slug>: True per matching module
+        """
+        metadata = metadata or {}
+        haystack = " ".join([
+            text,
+            str(metadata.get("section", "")),
+            str(metadata.get("source", "")).replace("_", " ")
+        ])
+        return {
+            module_field(slug): True
+            for slug, module in self.modules.items()
+            if module["pattern"].search(haystack)
+        }
+
+    def resolve(self, module: Optional[str]) -> Optional[str]:
+        """
+        Map a requested module to the slug of a configured module
+
+        Tried in order: exact name or slug, one of a module's keywords, then a
+        shortened name whose words all occur in exactly one module name
+        ("Orchestration" -> "Simulation Orchestration").
+
+        Args:
+            module: Module requested by the client
+
+        Returns:
+            Slug of a configured module, or None when unknown or ambiguous
+        """
+        if not module:
+            return None
+        slug = module_slug(module)
+        if not slug:
+            return None
+        if slug in self.modules:
+            return slug
+
+        requested = module.lower().strip()
+        matches = [s for s, m in self.modules.items() if requested in m["keywords"]]
+        if not matches:
+            words = set(slug.split("_"))
+            matches = [s for s in self.modules if words <= set(s.split("_"))]
+        return matches[0] if len(matches) == 1 else None
+
+    def names(self) -> List[str]:
+        """Configured module names, in config order"""
+        return [module["name"] for module in self.modules.values()]
+
+    def settings(self) -> Dict[str, List[str]]:
+        """Keywords per module; part of the index settings so tag changes force a reindex"""
+        return {slug: module["keywords"] for slug, module in self.modules.items()}
@@ -0,0 +1,302 @@
+"""
+Token-budgeted prompt assembly
+Packs the system prompt, conversation history and retrieved context into a fixed input token budget
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+USER_MESSAGE_TEMPLATE = """Context from documentation:
+{context}
+
+User question: {query}
+
+Please provide a clear, technical response based on the documentation above."""
+
+TRUNCATION_MARKER = "\n[...]"
+
+
+def format_context_entry(doc: Dict[str, Any]) -> str:
+    """
+    Format one retrieved chunk for the prompt
+
+    Args:
+        doc: Retrieved chunk with content and metadata
+
+    Returns:
+        Chunk text headed by its source (and section, when known)
+    """
+    metadata = doc["metadata"]
+    header = f"Source: {metadata['source']}"
+    if metadata.get("section"):
+        header += f" ({metadata['section']})"
+    return f"{header}\n{doc['content']}"
+
+
+def load_token_counter(encoding_name: str) -> Callable[[str], int]:
+    """
+    Build a token counting function
+
+    tiktoken's encoding approximates the model tokenizer closely enough for
+    budgeting. If it cannot be loaded (it downloads its vocabulary on first
+    use) counts fall back to a 4-characters-per-token estimate.
+
+    Args:
+        encoding_name: tiktoken encoding name
+
+    Returns:
+        Function returning the token count of a text
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning(f"tiktoken encoding {encoding_name} unavailable ({e}), estimating tokens from length")
+        return lambda text: (len(text) + 3) // 4
+
+
+class PromptBuilder:
+    """
+    Assembles LLM input within an input token budget
+
+    The system prompt and the question are always included. The remaining
+    budget is split between retrieved context and history by priority:
+
+    1. Context chunks in retrieval rank order, up to context_share of the
+       remainder (plus whatever history leaves unused). A chunk that does not
+       fit is truncated when enough room is left, otherwise it and every
+       lower-ranked chunk are dropped.
+    2. History messages newest first, each capped at history_message_tokens
+       (long earlier answers are truncated), until the budget is spent. The
+       first message that does not fit is truncated to the remaining room when
+       at least min_chunk_tokens are left (an answer shares that room with its
+       question, so history still opens with a user turn); older messages are
+       dropped.
+    """
+
+    def __init__(
+        self,
+        input_token_budget: int = 6000,
+        max_history_messages: int = 5,
+        history_message_tokens: int = 400,
+        context_share: float = 0.7,
+        min_chunk_tokens: int = 64,
+        encoding_name: str = "cl100k_base"
+    ):
+        """
+        Initialize builder
+
+        Args:
+            input_token_budget: Maximum input tokens (system + messages)
+            max_history_messages: Most recent history messages considered
+            history_message_tokens: Cap per history message
+            context_share: Share of the free budget reserved for context over history
+            min_chunk_tokens: Smallest truncated chunk or history message worth including
+            encoding_name: tiktoken encoding used for counting
+        """
+        self.input_token_budget = input_token_budget
+        self.max_history_messages = max(0, max_history_messages)
+        self.history_message_tokens = history_message_tokens
+        self.context_share = min(max(context_share, 0.0), 1.0)
+        self.min_chunk_tokens = min_chunk_tokens
+        self.count_tokens = load_token_counter(encoding_name)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text to at most max_tokens, keeping its beginning
+
+        Args:
+            text: Text to truncate
+            max_tokens: Token limit including the truncation marker
+
+        Returns:
+            Original text if it fits, else a prefix ending with a truncation marker
+        """
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        limit = max_tokens - self.count_tokens(TRUNCATION_MARKER)
+        if limit <= 0:
+            return ""
+
+        # Binary search on characters for the longest prefix within the limit
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.count_tokens(text[:mid]) <= limit:
+                low = mid
+            else:
+                high = mid - 1
+        cut = text[:low]
+        boundary = max(cut.rfind("\n"), cut.rfind(". "))
+        if boundary > len(cut) // 2:
+            cut = cut[:boundary + 1]
+        return cut.rstrip() + TRUNCATION_MARKER
+
+    def _fit_message(self, msg: Dict[str, Any], room: int) -> Optional[Dict[str, Any]]:
+        """
+        Truncate a history message to the room left in the budget
+
+        Args:
+            msg: Capped history message
+            room: Tokens available
+
+        Returns:
+            Truncated message, or None when room is below min_chunk_tokens
+        """
+        if room < self.min_chunk_tokens:
+            return None
+        content = self.truncate(msg["original"], room)
+        return dict(msg, content=content, tokens=self.count_tokens(content))
+
+    def build(
+        self,
+        system_prompt: str,
+        query: str,
+        context: List[Dict[str, Any]],
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Assemble the prompt
+
+        Args:
+            system_prompt: System prompt
+            query: User's question
+            context: Retrieved chunks, best first
+            history: Previous conversation messages, oldest first
+
+        Returns:
+            Dict with system, messages, the context chunks actually used, and token usage
+        """
+        system_tokens = self.count_tokens(system_prompt)
+        fixed_tokens = system_tokens + self.count_tokens(USER_MESSAGE_TEMPLATE.format(context="", query=query))
+        available = max(0, self.input_token_budget - fixed_tokens)
+
+        # Cap history messages first so their claim on the budget is known
+        recent = (history or [])[-self.max_history_messages:] if self.max_history_messages else []
+        capped_history = []
+        for msg in recent:
+            content = self.truncate(msg["content"], self.history_message_tokens)
+            capped_history.append({
+                "role": msg["role"],
+                "content": content,
+                "tokens": self.count_tokens(content),
+                "original": msg["content"]
+            })
+        history_demand = sum(msg["tokens"] for msg in capped_history)
+
+        context_budget = available - min(history_demand, int(available * (1 - self.context_share)))
+        used_context = []
+        context_parts = []
+        context_tokens = 0
+        truncated_chunks = 0
+        separator_tokens = self.count_tokens("\n\n")
+        for doc in context:
+            entry = format_context_entry(doc)
+            cost = self.count_tokens(entry) + (separator_tokens if context_parts else 0)
+            if context_tokens + cost > context_budget:
+                room = context_budget - context_tokens - (separator_tokens if context_parts else 0)
+                if room < self.min_chunk_tokens:
+                    break
+                entry = self.truncate(entry, room)
+                cost = self.count_tokens(entry) + (separator_tokens if context_parts else 0)
+                truncated_chunks += 1
+            context_parts.append(entry)
+            used_context.append(doc)
+            context_tokens += cost
+            if context_tokens >= context_budget:
+                break
+
+        # History gets everything context left over, newest messages first
+        history_budget = available - context_tokens
+        kept_history = []
+        history_tokens = 0
+        for idx in range(len(capped_history) - 1, -1, -1):
+            msg = capped_history[idx]
+            room = history_budget - history_tokens
+            if msg["tokens"] <= room:
+                kept_history.insert(0, msg)
+                history_tokens += msg["tokens"]
+                continue
+            
+            # Truncate the newest message that does not fit, then stop
+            partial = []
+            if msg["role"] == "user":
+                partial = [self._fit_message(msg, room)]
+            elif idx > 0 and capped_history[idx - 1]["role"] == "user":
+                question = capped_history[idx - 1]
+                if question["tokens"] > room // 2:
+                    question = self._fit_message(question, room // 2)
+                if question:
+                    partial = [question, self._fit_message(msg, room - question["tokens"])]
+            if partial and all(partial):
+                kept_history[:0] = partial
+                history_tokens += sum(part["tokens"] for part in partial)
+            break
+        # Messages must open with a user turn
+        while kept_history and kept_history[0]["role"] != "user":
+            history_tokens -= kept_history.pop(0)["tokens"]
+        truncated_history = sum(msg["content"] != msg["original"] for msg in kept_history)
+
+        messages = [{"role": msg["role"], "content": msg["content"]} for msg in kept_history]
+        messages.append({
+            "role": "user",
+            "content": USER_MESSAGE_TEMPLATE.format(context="\n\n".join(context_parts), query=query)
+        })
+
+        usage = {
+            "budget": self.input_token_budget,
+            "system_tokens": system_tokens,
+            "history_tokens": history_tokens,
+            "context_tokens": context_tokens,
+            "input_tokens": fixed_tokens + history_tokens + context_tokens,
+            "context_chunks": len(used_context),
+            "context_chunks_dropped": len(context) - len(used_context),
+            "context_chunks_truncated": truncated_chunks,
+            "history_messages": len(kept_history),
+            "history_messages_dropped": len(history or []) - len(kept_history),
+            "history_messages_truncated": truncated_history
+        }
+        return {
+            "system": system_prompt,
+            "messages": messages,
+            "context": used_context,
+            "usage": usage
+        }
+
+
+def build_request(
+    prompt: Dict[str, Any],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    prompt_caching: bool = True
+) -> Dict[str, Any]:
+    """
+    Turn a built prompt into messages.create / messages.stream keyword arguments
+
+    With prompt caching the system prompt, which is constant per mode, is the
+    only cache breakpoint. History is a sliding, truncated window, so a prefix
+    ending inside it changes on nearly every turn and would only pay for cache
+    writes.
+
+    Args:
+        prompt: Result of PromptBuilder.build
+        model: Model name
+        max_tokens: Output token limit
+        temperature: Sampling temperature
+        prompt_caching: Mark the system prompt with cache_control
+
+    Returns:
+        Request keyword arguments
+    """
+    system = prompt["system"]
+    if prompt_caching:
+        system = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "system": system,
+        "messages": prompt["messages"]
+    }
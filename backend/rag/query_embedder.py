@@ -0,0 +1,114 @@
+"""
+Micro-batching query embedder
+Coalesces concurrent query embeddings into a single encode() call
+"""
+
+import asyncio
+from typing import List, Tuple, Callable, Dict, Any, Optional
+
+from rag.executor import BoundedExecutor
+
+
+class BatchingQueryEmbedder:
+    """
+    Collects queries arriving within a short window and embeds them together
+
+    A batch is dispatched when the window elapses or when max_batch_size queries
+    are waiting, whichever comes first. Each caller awaits its own vector.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], List[List[float]]],
+        executor: BoundedExecutor,
+        window_ms: float = 5.0,
+        max_batch_size: int = 32
+    ):
+        """
+        Initialize embedder
+
+        Args:
+            encode_fn: Blocking function embedding a list of texts
+            executor: Executor the encode call runs on
+            window_ms: Time to wait for more queries after the first one arrives
+            max_batch_size: Batch size that triggers an immediate dispatch
+        """
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._batches = 0
+        self._queries = 0
+        self._largest_batch = 0
+
+    async def embed(self, query: str) -> List[float]:
+        """
+        Embed a single query, sharing the encode call with concurrent callers
+
+        Args:
+            query: Query text
+
+        Returns:
+            Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future))
+
+        if len(self._pending) >= self.max_batch_size or self.window == 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Dispatch all pending queries as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """
+        Encode a batch and resolve each caller's future
+
+        Args:
+            batch: Pending (query, future) pairs
+        """
+        self._batches += 1
+        self._queries += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+
+        try:
+            vectors = await self.executor.run(self.encode_fn, [query for query, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            "batches": self._batches,
+            "queries": self._queries,
+            "avg_batch_size": round(self._queries / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size
+        }
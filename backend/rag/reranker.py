@@ -0,0 +1,147 @@
+"""
+Cross-encoder re-ranking
+Scores (query, chunk) pairs jointly to reorder and prune first-stage retrieval candidates
+"""
+
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from rag.cache import LRUCache, normalize_query
+
+
+class CrossEncoderReranker:
+    """
+    Re-ranks retrieval candidates with a small CPU cross-encoder
+
+    Pair scores are cached by (normalized query, chunk ID); chunk IDs are
+    content-addressed, so a cached score stays valid across re-indexing. The
+    per-pair scoring cost is tracked as a moving average and used to skip
+    re-ranking when the uncached pairs would not finish before the deadline.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 16,
+        cache_size: int = 4096,
+        cache_ttl_seconds: Optional[float] = None
+    ):
+        """
+        Initialize reranker
+
+        Args:
+            model_name: sentence-transformers CrossEncoder model
+            batch_size: Pairs scored per forward pass
+            cache_size: Maximum cached pair scores (0 disables caching)
+            cache_ttl_seconds: Cached score lifetime (None or 0 for no expiry)
+        """
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.model = None
+        self.score_cache = LRUCache(max_size=cache_size, ttl_seconds=cache_ttl_seconds)
+        self._lock = threading.Lock()
+        self.seconds_per_pair: Optional[float] = None
+        self.reranked = 0
+        self.skipped_budget = 0
+        self.pairs_scored = 0
+
+    def load(self):
+        """Load the cross-encoder model (blocking)"""
+        from sentence_transformers import CrossEncoder
+
+        logger.info(f"Loading re-ranking model: {self.model_name}")
+        self.model = CrossEncoder(self.model_name, device="cpu")
+
+    def estimate_seconds(self, query: str, candidates: List[Dict[str, Any]]) -> float:
+        """
+        Estimate the time needed to score the uncached pairs of a query
+
+        Args:
+            query: Query text
+            candidates: Candidate chunks
+
+        Returns:
+            Estimated seconds (0 before the first measurement or when all pairs are cached)
+        """
+        if self.seconds_per_pair is None:
+            return 0.0
+        key = normalize_query(query)
+        uncached = sum(1 for doc in candidates if self.score_cache.peek((key, doc["id"])) is None)
+        return uncached * self.seconds_per_pair
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        top_k: int,
+        min_score: Optional[float] = None,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score and reorder candidates, blocking (run on a worker thread)
+
+        Args:
+            query: Query text
+            candidates: First-stage candidates with "id" and "content"
+            top_k: Number of chunks to keep
+            min_score: Drop chunks scoring below this value
+            deadline: time.monotonic() value by which scoring must finish; when the
+                estimate says it would not, the first-stage order is kept
+
+        Returns:
+            Up to top_k candidates, best first, each with a rerank_score
+            (None when re-ranking was skipped)
+        """
+        if not candidates or self.model is None:
+            return candidates[:top_k]
+
+        if deadline is not None and time.monotonic() + self.estimate_seconds(query, candidates) > deadline:
+            self.skipped_budget += 1
+            logger.warning(f"Skipping re-ranking of {len(candidates)} candidates: latency budget exhausted")
+            return [dict(doc, rerank_score=None) for doc in candidates[:top_k]]
+
+        key = normalize_query(query)
+        scores: List[Optional[float]] = [self.score_cache.get((key, doc["id"])) for doc in candidates]
+        missing = [idx for idx, score in enumerate(scores) if score is None]
+
+        if missing:
+            start = time.perf_counter()
+            predicted = self.model.predict(
+                [(query, candidates[idx]["content"]) for idx in missing],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            elapsed = time.perf_counter() - start
+            for idx, score in zip(missing, predicted):
+                scores[idx] = float(score)
+                self.score_cache.set((key, candidates[idx]["id"]), scores[idx])
+
+            with self._lock:
+                per_pair = elapsed / len(missing)
+                self.seconds_per_pair = (
+                    per_pair if self.seconds_per_pair is None
+                    else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+                )
+                self.pairs_scored += len(missing)
+
+        self.reranked += 1
+        ranked = sorted(zip(candidates, scores), key=lambda pair: pair[1], reverse=True)
+        kept = [
+            dict(doc, rerank_score=round(score, 4))
+            for doc, score in ranked
+            if min_score is None or score >= min_score
+        ]
+        return kept[:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get reranker statistics"""
+        return {
+            "model": self.model_name,
+            "reranked": self.reranked,
+            "skipped_budget": self.skipped_budget,
+            "pairs_scored": self.pairs_scored,
+            "ms_per_pair": round(self.seconds_per_pair * 1000, 3) if self.seconds_per_pair is not None else None,
+            "score_cache": self.score_cache.stats()
+        }
@@ -0,0 +1,177 @@
+"""
+Semantic response cache
+Reuses generated answers for queries that are near-identical in embedding space
+"""
+
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticResponseCache:
+    """
+    Cache of LLM responses keyed by query embedding, mode, module and corpus version
+
+    A lookup returns the stored response of the most similar cached query in the
+    same (mode, module) bucket when its cosine similarity reaches the threshold.
+    All entries are dropped when the corpus version changes, so answers never
+    outlive the index they were generated from.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl_seconds: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Maximum number of cached responses (least recently used are evicted)
+            ttl_seconds: Entry lifetime in seconds (None or 0 for no expiry)
+        """
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds or None
+        self.corpus_version: Optional[str] = None
+        self._buckets: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _sync_version(self, corpus_version: Optional[str]):
+        """Drop every entry if the corpus changed since they were stored"""
+        if corpus_version != self.corpus_version:
+            if self._buckets:
+                self.invalidations += 1
+            self._buckets.clear()
+            self.corpus_version = corpus_version
+
+    def lookup(
+        self,
+        embedding: List[float],
+        mode: str,
+        module: Optional[str],
+        corpus_version: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a semantically equivalent query
+
+        Args:
+            embedding: Query embedding
+            mode: Conversation mode
+            module: Active module, if any
+            corpus_version: Version of the index the answer must come from
+
+        Returns:
+            Copy of the cached response data with cache details, or None
+        """
+        with self._lock:
+            self._sync_version(corpus_version)
+            entries = self._buckets.get((mode, module or ""), [])
+
+            now = time.monotonic()
+            if self.ttl:
+                live = [e for e in entries if now - e["stored_at"] <= self.ttl]
+                self.evictions += len(entries) - len(live)
+                entries[:] = live
+
+            if not entries:
+                self.misses += 1
+                return None
+
+            query_vector = self._normalize(embedding)
+            similarities = np.stack([e["vector"] for e in entries]) @ query_vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = entries[best]
+            entry["hits"] += 1
+            entry["last_used"] = now
+            self.hits += 1
+
+            return dict(
+                entry["response"],
+                cache={"hit": True, "similarity": round(similarity, 4), "entry_hits": entry["hits"]}
+            )
+
+    def store(
+        self,
+        embedding: List[float],
+        mode: str,
+        module: Optional[str],
+        corpus_version: Optional[str],
+        response: Dict[str, Any]
+    ):
+        """
+        Cache a generated response
+
+        Args:
+            embedding: Query embedding
+            mode: Conversation mode
+            module: Active module, if any
+            corpus_version: Version of the index the answer came from
+            response: Response data to return on future hits
+        """
+        with self._lock:
+            self._sync_version(corpus_version)
+            now = time.monotonic()
+            self._buckets.setdefault((mode, module or ""), []).append({
+                "vector": self._normalize(embedding),
+                "response": dict(response),
+                "stored_at": now,
+                "last_used": now,
+                "hits": 0
+            })
+            self._evict()
+
+    def _evict(self):
+        """Evict least recently used entries beyond max_entries"""
+        total = sum(len(entries) for entries in self._buckets.values())
+        while total > self.max_entries:
+            key, idx = min(
+                ((key, idx) for key, entries in self._buckets.items() for idx in range(len(entries))),
+                key=lambda ref: self._buckets[ref[0]][ref[1]]["last_used"]
+            )
+            del self._buckets[key][idx]
+            self.evictions += 1
+            total -= 1
+
+    def invalidate(self, corpus_version: Optional[str] = None):
+        """
+        Drop all cached responses
+
+        Args:
+            corpus_version: New corpus version to bind the cache to
+        """
+        with self._lock:
+            if self._buckets:
+                self.invalidations += 1
+            self._buckets.clear()
+            self.corpus_version = corpus_version
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(len(entries) for entries in self._buckets.values()),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "corpus_version": self.corpus_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
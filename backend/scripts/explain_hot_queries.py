@@ -0,0 +1,63 @@
+"""
+EXPLAIN the hot conversation queries
+Prints the query plans for the history and pagination queries so index usage can be checked
+
+Usage (from backend/):
+    python -m scripts.explain_hot_queries [session_id]
+"""
+
+import sys
+import asyncio
+from sqlalchemy import text
+
+from models.database import engine
+
+
+# Queries issued per chat turn / history page, with the index expected to serve each
+HOT_QUERIES = {
+    "session lookup (conversations_session_id_key)": """
+        SELECT id FROM conversations WHERE session_id = :session_id
+    """,
+    "recent history (idx_messages_conversation_timestamp_id, backward)": """
+        SELECT m.role, m.content, m.timestamp
+        FROM conversations c
+        LEFT JOIN LATERAL (
+            SELECT role, content, timestamp FROM messages
+            WHERE conversation_id = c.id
+            ORDER BY timestamp DESC
+            LIMIT 10
+        ) m ON true
+        WHERE c.session_id = :session_id
+    """,
+    "history page forward (idx_messages_conversation_timestamp_id)": """
+        SELECT id, timestamp FROM messages
+        WHERE conversation_id = (SELECT id FROM conversations WHERE session_id = :session_id)
+          AND (timestamp, id) > ('epoch'::timestamp, '')
+        ORDER BY timestamp, id
+        LIMIT 101
+    """,
+    "history page backward (idx_messages_conversation_timestamp_id)": """
+        SELECT id, timestamp FROM messages
+        WHERE conversation_id = (SELECT id FROM conversations WHERE session_id = :session_id)
+        ORDER BY timestamp DESC, id DESC
+        LIMIT 101
+    """,
+}
+
+
+async def explain(session_id: str):
+    """Print EXPLAIN ANALYZE output for every hot query"""
+    async with engine.connect() as conn:
+        for name, query in HOT_QUERIES.items():
+            result = await conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"),
+                {"session_id": session_id}
+            )
+            print(f"\n=== {name} ===")
+            for row in result:
+                print(row[0])
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(explain(sys.argv[1] if len(sys.argv) > 1 else "demo-session-001"))
@@ -58,7 +58,9 @@ function ChatWidget() {
 
   const loadHistory = async (sid) => {
     try {
-      const response = await axios.get(`${API_URL}/api/v1/chat/history/${sid}`);
+      const response = await axios.get(`${API_URL}/api/v1/chat/history/${sid}`, {
+        params: { direction: 'backward', limit: 50 }
+      });
       if (response.data && response.data.messages) {
         const formattedMessages = response.data.messages.map(msg => ({
           role: msg.role,
@@ -68,7 +68,9 @@ function Dashboard() {
 
   const loadHistory = async (sid) => {
     try {
-      const response = await axios.get(`${API_URL}/api/v1/chat/history/${sid}`);
+      const response = await axios.get(`${API_URL}/api/v1/chat/history/${sid}`, {
+        params: { direction: 'backward', limit: 50 }
+      });
       if (response.data && response.data.messages && response.data.messages.length > 0) {
         const formattedMessages = response.data.messages.map(msg => ({
           role: msg.role,
@@ -115,7 +115,7 @@ function MessageBubble({ message, onSuggestionClick }) {
           <div className="message-sources">
             <span className="sources-label">Sources:</span>
             {message.sources.map((source, index) => (
-              <span key={index} className="source-tag">
+              <span key={index} className="source-tag" title={source.section}>
                 {source.source}
               </span>
             ))}
@@ -4,9 +4,12 @@ Based on actual lf-connectivity/maveric repository structure
 """
 
 import os
+import random
+import asyncio
 import requests
+import httpx
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 from datetime import datetime
 
@@ -16,7 +19,7 @@ class MavericDocIngestion:
     Ingests full Maveric RADP documentation from GitHub
     """
     
-    GITHUB_RAW_BASE = "https://raw.githubusercontent.com"
+    GITHUB_RAW_BASE = os.getenv("GITHUB_RAW_BASE", "https://raw.githubusercontent.com")
     REPO_OWNER = "lf-connectivity"
     REPO_NAME = "maveric"
     BRANCH = "main"
@@ -55,12 +58,27 @@ class MavericDocIngestion:
         self.github_token = os.getenv("GITHUB_TOKEN")
         self.headers = {}
         
+        # Async fetch settings
+        self.concurrency = int(os.getenv("INGEST_CONCURRENCY", 8))
+        self.max_retries = int(os.getenv("INGEST_MAX_RETRIES", 3))
+        self.backoff_base = float(os.getenv("INGEST_BACKOFF_BASE", 1.0))
+        self.timeout = float(os.getenv("INGEST_TIMEOUT", 30))
+        
         if self.github_token:
             self.headers["Authorization"] = f"token {self.github_token}"
             print("✓ Using GitHub token for API requests")
         else:
             print("⚠ No GitHub token - using public access")
     
+    def _file_url(self, file_path: str) -> str:
+        """Raw content URL of a repository file"""
+        return f"{self.GITHUB_RAW_BASE}/{self.REPO_OWNER}/{self.REPO_NAME}/{self.BRANCH}/{file_path}"
+    
+    @staticmethod
+    def _safe_filename(file_path: str) -> str:
+        """Flatten a repository path into a file name in the output directory"""
+        return file_path.replace("/", "_").replace("\\", "_")
+    
     def fetch_file_content(self, file_path: str) -> tuple:
         """
         Fetch file content from GitHub
@@ -68,7 +86,7 @@ class MavericDocIngestion:
         Returns:
             Tuple of (content, success, status_code)
         """
-        url = f"{self.GITHUB_RAW_BASE}/{self.REPO_OWNER}/{self.REPO_NAME}/{self.BRANCH}/{file_path}"
+        url = self._file_url(file_path)
         
         try:
             response = requests.get(url, headers=self.headers, timeout=30)
@@ -82,60 +100,194 @@ class MavericDocIngestion:
             return "", False, 0
     
     def ingest_documentation(self) -> Dict[str, Any]:
-        """Ingest Maveric documentation"""
+        """Ingest Maveric documentation one file at a time (blocking)"""
         
-        print("\n" + "="*70)
-        print("MAVERIC RADP TARGETED DOCUMENTATION INGESTION")
-        print("="*70)
-        print(f"Repository: {self.REPO_OWNER}/{self.REPO_NAME}")
-        print(f"Branch: {self.BRANCH}")
-        print("-"*70)
+        self._print_header("sequential")
+        stats = self._new_stats()
+        
+        print(f"\n📥 Fetching {len(self.TARGET_DOCS)} documentation files...\n")
+        
+        for idx, file_path in enumerate(self.TARGET_DOCS, 1):
+            content, success, status_code = self.fetch_file_content(file_path)
+            if not (success and content) and status_code == 200:
+                status_code = 0
+            self._record_result(stats, idx, file_path, {"status": status_code, "content": content})
+        
+        return self._finish(stats)
+    
+    async def ingest_documentation_async(self) -> Dict[str, Any]:
+        """
+        Ingest Maveric documentation concurrently with conditional requests
+        
+        Files are fetched over one pooled HTTP client with at most
+        self.concurrency requests in flight. Files whose ETag (or Last-Modified)
+        is recorded in ingestion_metadata.json and still on disk are requested
+        with If-None-Match / If-Modified-Since, so unchanged files cost a 304.
+        """
+        self._print_header(f"async, concurrency {self.concurrency}")
+        stats = self._new_stats()
+        previous = self._load_previous_files()
+        
+        print(f"\n📥 Fetching {len(self.TARGET_DOCS)} documentation files...\n")
+        
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        
+        async with httpx.AsyncClient(headers=self.headers, limits=limits, timeout=self.timeout) as client:
+            async def fetch(idx: int, file_path: str):
+                async with semaphore:
+                    result = await self.fetch_file_async(client, file_path, previous.get(file_path))
+                self._record_result(stats, idx, file_path, result, previous.get(file_path))
+            
+            await asyncio.gather(*(
+                fetch(idx, file_path) for idx, file_path in enumerate(self.TARGET_DOCS, 1)
+            ))
         
-        stats = {
+        # Keep the file list in TARGET_DOCS order regardless of completion order
+        order = {file_path: idx for idx, file_path in enumerate(self.TARGET_DOCS)}
+        stats["file_list"].sort(key=lambda entry: order[entry["original_path"]])
+        
+        return self._finish(stats)
+    
+    async def fetch_file_async(
+        self,
+        client: httpx.AsyncClient,
+        file_path: str,
+        cached: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch one file, conditionally when a cached validator exists
+        
+        403 (rate limiting), 429, 5xx responses and transport errors are retried
+        with exponential backoff and jitter, honouring Retry-After when present.
+        
+        Args:
+            client: Shared HTTP client
+            file_path: Repository path of the file
+            cached: Previous file_list entry for this file, if any
+            
+        Returns:
+            Dict with status (0 on transport failure), content, etag and last_modified
+        """
+        headers = {}
+        if cached and (self.output_dir / cached["saved_as"]).exists():
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        
+        url = self._file_url(file_path)
+        status = 0
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await client.get(url, headers=headers)
+                status = response.status_code
+                if status not in (403, 429) and status < 500:
+                    return {
+                        "status": status,
+                        "content": response.text if status == 200 else "",
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")
+                    }
+                retry_after = response.headers.get("Retry-After")
+            except httpx.HTTPError:
+                status = 0
+            
+            if attempt < self.max_retries:
+                delay = self.backoff_base * 2 ** attempt * (1 + random.random() / 2)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                await asyncio.sleep(min(delay, 60))
+        
+        return {"status": status, "content": ""}
+    
+    def _new_stats(self) -> Dict[str, Any]:
+        return {
             "files_attempted": len(self.TARGET_DOCS),
             "files_downloaded": 0,
+            "files_unchanged": 0,
             "files_not_found": 0,
             "files_failed": 0,
             "total_size": 0,
+            "bytes_downloaded": 0,
             "file_list": []
         }
+    
+    def _record_result(
+        self,
+        stats: Dict[str, Any],
+        idx: int,
+        file_path: str,
+        result: Dict[str, Any],
+        cached: Optional[Dict[str, Any]] = None
+    ):
+        """Save a fetched file, update statistics and print its status line"""
+        status_code = result["status"]
+        content = result.get("content", "")
+        label = f"[{idx:2d}/{len(self.TARGET_DOCS)}] {file_path:<50}"
         
-        print(f"\n📥 Fetching {len(self.TARGET_DOCS)} documentation files...\n")
-        
-        for idx, file_path in enumerate(self.TARGET_DOCS, 1):
-            print(f"[{idx:2d}/{len(self.TARGET_DOCS)}] {file_path:<50}", end=" ")
+        if status_code == 200 and content:
+            safe_filename = self._safe_filename(file_path)
+            self._save_document(safe_filename, content)
             
-            content, success, status_code = self.fetch_file_content(file_path)
-            
-            if success and content:
-                # Create sanitized filename
-                safe_filename = file_path.replace("/", "_").replace("\\", "_")
-                self._save_document(safe_filename, content)
-                
-                stats["files_downloaded"] += 1
-                stats["total_size"] += len(content)
-                stats["file_list"].append({
-                    "original_path": file_path,
-                    "saved_as": safe_filename,
-                    "size": len(content)
-                })
-                
-                size_kb = len(content) / 1024
-                print(f"✓ {size_kb:6.1f} KB")
+            stats["files_downloaded"] += 1
+            stats["total_size"] += len(content)
+            stats["bytes_downloaded"] += len(content)
+            entry = {
+                "original_path": file_path,
+                "saved_as": safe_filename,
+                "size": len(content)
+            }
+            if result.get("etag"):
+                entry["etag"] = result["etag"]
+            if result.get("last_modified"):
+                entry["last_modified"] = result["last_modified"]
+            stats["file_list"].append(entry)
             
-            elif status_code == 404:
-                stats["files_not_found"] += 1
-                print(f"⊘ Not found")
-            
-            elif status_code == 403:
-                stats["files_failed"] += 1
-                print(f"✗ Rate limited")
-            
-            else:
-                stats["files_failed"] += 1
-                print(f"✗ Error ({status_code})")
+            print(f"{label} ✓ {len(content) / 1024:6.1f} KB")
+        
+        elif status_code == 304 and cached:
+            stats["files_unchanged"] += 1
+            stats["total_size"] += cached.get("size", 0)
+            stats["file_list"].append(cached)
+            print(f"{label} = Unchanged")
         
-        # Save metadata
+        elif status_code == 404:
+            stats["files_not_found"] += 1
+            print(f"{label} ⊘ Not found")
+        
+        elif status_code == 403:
+            stats["files_failed"] += 1
+            print(f"{label} ✗ Rate limited")
+        
+        else:
+            stats["files_failed"] += 1
+            print(f"{label} ✗ Error ({status_code})")
+    
+    def _load_previous_files(self) -> Dict[str, Dict[str, Any]]:
+        """File list of the previous run, keyed by repository path"""
+        metadata_path = self.output_dir / "ingestion_metadata.json"
+        if not metadata_path.exists():
+            return {}
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {entry["original_path"]: entry for entry in metadata.get("file_list", [])}
+    
+    def _print_header(self, fetch_mode: str):
+        print("\n" + "="*70)
+        print("MAVERIC RADP TARGETED DOCUMENTATION INGESTION")
+        print("="*70)
+        print(f"Repository: {self.REPO_OWNER}/{self.REPO_NAME}")
+        print(f"Branch: {self.BRANCH}")
+        print(f"Fetch mode: {fetch_mode}")
+        print("-"*70)
+    
+    def _finish(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Save metadata and print the summary"""
         self._save_metadata(stats)
         
         print("\n" + "="*70)
@@ -143,9 +295,11 @@ class MavericDocIngestion:
         print("="*70)
         print(f"  Files attempted:  {stats['files_attempted']}")
         print(f"  ✓ Downloaded:     {stats['files_downloaded']}")
+        print(f"  = Unchanged:      {stats['files_unchanged']}")
         print(f"  ⊘ Not found:      {stats['files_not_found']}")
         print(f"  ✗ Failed:         {stats['files_failed']}")
         print(f"  Total size:       {stats['total_size']:,} bytes ({stats['total_size']/1024:.1f} KB)")
+        print(f"  Downloaded:       {stats['bytes_downloaded']:,} bytes")
         print(f"  Output dir:       {self.output_dir.absolute()}")
         print("="*70 + "\n")
         
@@ -167,13 +321,15 @@ class MavericDocIngestion:
             "statistics": {
                 "files_attempted": stats["files_attempted"],
                 "files_downloaded": stats["files_downloaded"],
+                "files_unchanged": stats["files_unchanged"],
                 "files_not_found": stats["files_not_found"],
                 "files_failed": stats["files_failed"],
-                "total_size": stats["total_size"]
+                "total_size": stats["total_size"],
+                "bytes_downloaded": stats["bytes_downloaded"]
             },
             "file_list": stats["file_list"],
             "timestamp": datetime.now().isoformat(),
-            "version": "2.0"
+            "version": "2.1"
         }
         
         metadata_path = self.output_dir / "ingestion_metadata.json"
@@ -189,9 +345,12 @@ def main():
     print("   Targeting actual repository files\n")
     
     ingestion = MavericDocIngestion()
-    stats = ingestion.ingest_documentation()
+    if os.getenv("INGEST_MODE", "async").lower() == "sync":
+        stats = ingestion.ingest_documentation()
+    else:
+        stats = asyncio.run(ingestion.ingest_documentation_async())
     
-    if stats["files_downloaded"] > 0:
+    if stats["files_downloaded"] + stats["files_unchanged"] > 0:
         print("\n✅ SUCCESS! Documentation ready for RAG engine.")
     else:
         print("\n❌ FAILED! No files downloaded.")
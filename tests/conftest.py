@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend modules import as top-level packages (rag, chat, models), as in the app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
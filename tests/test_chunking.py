@@ -0,0 +1,26 @@
+"""
+Tests for structure-aware chunking
+"""
+
+from rag.chunking import chunk_yaml
+
+COMPOSE = "version: '3'\nservices:\n  kafka:\n    image: confluentinc/cp-kafka\n    environment:\n" + "".join(
+    f"      KAFKA_SETTING_{i}: value-{i}\n" for i in range(20)
+) + "  api:\n    image: radp/api\n"
+
+
+def test_split_service_pieces_keep_their_key_path():
+    chunks = [c for c in chunk_yaml(COMPOSE, 200, 40) if c["metadata"].get("service") == "kafka"]
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["text"].startswith("services:\n  kafka:\n")
+        assert len(chunk["text"]) <= 200
+    body = "".join(c["text"].split("\n", 2)[2] + "\n" for c in chunks)
+    assert "KAFKA_SETTING_0" in body and "KAFKA_SETTING_19" in body
+
+
+def test_small_service_is_one_chunk():
+    chunks = [c for c in chunk_yaml(COMPOSE, 200, 40) if c["metadata"].get("service") == "api"]
+
+    assert [c["text"] for c in chunks] == ["services:\n  api:\n    image: radp/api"]
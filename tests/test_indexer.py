@@ -0,0 +1,77 @@
+"""
+Tests for the incremental indexer
+"""
+
+from pathlib import Path
+
+from rag.indexer import IncrementalIndexer
+
+
+class MemoryCollection:
+    """Just enough of a ChromaDB collection for the indexer"""
+
+    def __init__(self):
+        self.records = {}
+
+    def get(self, ids=None, include=()):
+        ids = [cid for cid in (self.records if ids is None else ids) if cid in self.records]
+        result = {"ids": ids}
+        for field in include:
+            result[field] = [self.records[cid][field] for cid in ids]
+        return result
+
+    def add(self, documents, embeddings, metadatas, ids):
+        for cid, document, embedding, metadata in zip(ids, documents, embeddings, metadatas):
+            self.records[cid] = {"documents": document, "embeddings": embedding, "metadatas": metadata}
+
+    def delete(self, ids):
+        for cid in ids:
+            self.records.pop(cid, None)
+
+    def count(self):
+        return len(self.records)
+
+
+def line_chunks(path):
+    lines = path.read_text().splitlines()
+    return [{"text": line, "metadata": {"line_start": idx + 1}} for idx, line in enumerate(lines) if line]
+
+
+def index(tmp_path, collection, text, previous, embedded):
+    path = tmp_path / "doc.md"
+    path.write_text(text)
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[float(len(t))] for t in texts]
+
+    indexer = IncrementalIndexer(collection, line_chunks, embed, client="test")
+    chunk_ids, report = indexer.run({"doc.md": str(hash(text))}, {"doc.md": Path(path)}, previous)
+    return {"files": {"doc.md": str(hash(text))}, "chunks": chunk_ids}, report
+
+
+def test_moved_chunks_get_fresh_metadata_without_reembedding(tmp_path):
+    collection = MemoryCollection()
+    embedded = []
+    manifest, _ = index(tmp_path, collection, "alpha\nbeta\n", {}, embedded)
+
+    embedded.clear()
+    _, report = index(tmp_path, collection, "intro\nalpha\nbeta\n", manifest, embedded)
+
+    assert embedded == ["intro"]
+    assert report["chunks_reused"] == 2
+    assert report["chunks_refreshed"] == 2
+    lines = {r["documents"]: r["metadatas"]["line_start"] for r in collection.records.values()}
+    assert lines == {"intro": 1, "alpha": 2, "beta": 3}
+    assert collection.get(ids=manifest["chunks"]["doc.md"], include=["embeddings"])["embeddings"] == [[5.0], [4.0]]
+
+
+def test_unmoved_chunks_are_left_alone(tmp_path):
+    collection = MemoryCollection()
+    embedded = []
+    manifest, _ = index(tmp_path, collection, "alpha\nbeta\n", {}, embedded)
+
+    _, report = index(tmp_path, collection, "alpha\nbeta\ngamma\n", manifest, embedded)
+
+    assert report["chunks_refreshed"] == 0
+    assert report["chunks_added"] == 1
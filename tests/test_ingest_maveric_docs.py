@@ -0,0 +1,133 @@
+"""
+Tests for the async Maveric documentation fetch against a local stub HTTP server
+"""
+
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ingest_maveric_docs import MavericDocIngestion
+
+
+class StubGitHub:
+    """
+    Raw-content server replaying scripted responses per repository path
+
+    Each path maps to a list of (status, body, headers) responses served in
+    order, the last one repeating, or to a function of the request headers
+    returning that tuple. Request headers are recorded per path.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = defaultdict(list)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("/main/", 1)[-1]
+                stub.requests[path].append(dict(self.headers))
+                responses = stub.routes.get(path, [(404, "", {})])
+                if callable(responses):
+                    status, body, headers = responses(self.headers)
+                else:
+                    served = len(stub.requests[path]) - 1
+                    status, body, headers = responses[min(served, len(responses) - 1)]
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def github():
+    with StubGitHub() as server:
+        yield server
+
+
+@pytest.fixture
+def make_ingestion(tmp_path, github):
+    def make(*target_docs):
+        ingestion = MavericDocIngestion(output_dir=str(tmp_path / "docs"))
+        ingestion.GITHUB_RAW_BASE = github.url
+        ingestion.TARGET_DOCS = list(target_docs)
+        ingestion.backoff_base = 0.01
+        ingestion.max_retries = 2
+        return ingestion
+    return make
+
+
+@pytest.mark.asyncio
+async def test_retries_server_error_then_saves_file(github, make_ingestion):
+    github.routes["README.md"] = [
+        (503, "unavailable", {}),
+        (200, "# Maveric", {"ETag": '"v1"'})
+    ]
+    ingestion = make_ingestion("README.md")
+
+    stats = await ingestion.ingest_documentation_async()
+
+    assert len(github.requests["README.md"]) == 2
+    assert stats["files_downloaded"] == 1
+    assert stats["files_failed"] == 0
+    assert (ingestion.output_dir / "README.md").read_text(encoding="utf-8") == "# Maveric"
+    assert stats["file_list"][0]["etag"] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_not_modified_keeps_saved_file(github, make_ingestion):
+    def conditional(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, "", {"ETag": '"v1"'}
+        return 200, "name,value\nrf,1\n", {"ETag": '"v1"'}
+
+    github.routes["apps/example/topology.csv"] = conditional
+    ingestion = make_ingestion("apps/example/topology.csv")
+    await ingestion.ingest_documentation_async()
+    saved = ingestion.output_dir / "apps_example_topology.csv"
+    modified = saved.stat().st_mtime_ns
+
+    stats = await ingestion.ingest_documentation_async()
+
+    assert github.requests["apps/example/topology.csv"][1]["If-None-Match"] == '"v1"'
+    assert stats["files_unchanged"] == 1
+    assert stats["files_downloaded"] == 0
+    assert saved.stat().st_mtime_ns == modified
+    assert saved.read_text(encoding="utf-8") == "name,value\nrf,1\n"
+    metadata = json.loads((ingestion.output_dir / "ingestion_metadata.json").read_text(encoding="utf-8"))
+    assert metadata["file_list"][0]["saved_as"] == "apps_example_topology.csv"
+
+
+@pytest.mark.asyncio
+async def test_missing_file_does_not_abort_run(github, make_ingestion):
+    github.routes["dc.yml"] = [(200, "services: {}\n", {})]
+    ingestion = make_ingestion("missing.md", "dc.yml")
+
+    stats = await ingestion.ingest_documentation_async()
+
+    assert len(github.requests["missing.md"]) == 1
+    assert stats["files_not_found"] == 1
+    assert stats["files_downloaded"] == 1
+    assert [entry["original_path"] for entry in stats["file_list"]] == ["dc.yml"]
+    assert not (ingestion.output_dir / "missing.md").exists()
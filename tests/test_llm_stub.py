@@ -0,0 +1,123 @@
+"""
+Tests for the offline LLM provider, request assembly and token accounting
+"""
+
+import pytest
+
+from rag.llm_stub import StubLLMClient
+from rag.llm_usage import LLMUsageTracker
+from rag.prompt_builder import PromptBuilder, build_request
+
+SYSTEM_PROMPT = "You are an expert guide for the Maveric RADP platform. " * 40
+
+
+def make_request(query, history=None, prompt_caching=True):
+    builder = PromptBuilder(input_token_budget=4000)
+    context = [{"content": "RADPClient.train() starts digital twin training.", "metadata": {"source": "README.md"}}]
+    prompt = builder.build(SYSTEM_PROMPT, query, context, history)
+    return build_request(prompt, model="stub", max_tokens=200, temperature=0.0, prompt_caching=prompt_caching)
+
+
+def cache_markers(request):
+    """Paths of every block carrying cache_control"""
+    markers = []
+    system = request["system"]
+    if isinstance(system, list):
+        markers += [("system", idx) for idx, block in enumerate(system) if "cache_control" in block]
+    for idx, message in enumerate(request["messages"]):
+        if isinstance(message["content"], list):
+            markers += [("messages", idx) for block in message["content"] if "cache_control" in block]
+    return markers
+
+
+def test_request_marks_only_system_prompt_for_caching():
+    history = [
+        {"role": "user", "content": "How do I train the digital twin?"},
+        {"role": "assistant", "content": "Call RADPClient.train with a model ID."}
+    ]
+    request = make_request("Which data format?", history)
+
+    assert cache_markers(request) == [("system", 0)]
+    assert request["system"][0]["text"] == SYSTEM_PROMPT
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert [m["role"] for m in request["messages"]] == ["user", "assistant", "user"]
+    assert all(isinstance(m["content"], str) for m in request["messages"])
+
+
+def test_request_without_caching_sends_plain_system_prompt():
+    request = make_request("Which data format?", prompt_caching=False)
+
+    assert request["system"] == SYSTEM_PROMPT
+    assert cache_markers(request) == []
+
+
+@pytest.mark.asyncio
+async def test_stub_reports_cache_write_then_read_for_shared_system_prompt():
+    client = StubLLMClient()
+
+    first = await client.messages.create(**make_request("How do I train the digital twin?"))
+    second = await client.messages.create(**make_request("What does RF prediction need?"))
+
+    assert first.usage.cache_creation_input_tokens > 0
+    assert first.usage.cache_read_input_tokens == 0
+    assert second.usage.cache_read_input_tokens == first.usage.cache_creation_input_tokens
+    assert second.usage.cache_creation_input_tokens == 0
+    assert second.usage.input_tokens > 0
+    assert "What does RF prediction need?" in second.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_stub_without_cache_control_never_caches():
+    client = StubLLMClient()
+
+    for _ in range(2):
+        message = await client.messages.create(**make_request("Same question", prompt_caching=False))
+        assert message.usage.cache_read_input_tokens == 0
+        assert message.usage.cache_creation_input_tokens == 0
+
+
+@pytest.mark.asyncio
+async def test_stub_stream_yields_text_and_final_usage():
+    client = StubLLMClient()
+
+    async with client.messages.stream(**make_request("Stream this answer")) as stream:
+        text = "".join([chunk async for chunk in stream.text_stream])
+        final = await stream.get_final_message()
+
+    assert text.strip() == final.content[0].text
+    assert final.usage.output_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_usage_tracker_accumulates_stub_responses():
+    client = StubLLMClient()
+    tracker = LLMUsageTracker()
+
+    first = tracker.record((await client.messages.create(**make_request("First question"))).usage)
+    second = tracker.record((await client.messages.create(**make_request("Second question"))).usage)
+    stats = tracker.stats()
+
+    assert stats["requests"] == 2
+    for field in ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"):
+        assert stats[field] == first[field] + second[field]
+    prompt_tokens = stats["input_tokens"] + stats["cache_read_input_tokens"] + stats["cache_creation_input_tokens"]
+    assert stats["cache_read_ratio"] == round(stats["cache_read_input_tokens"] / prompt_tokens, 4)
+    assert 0 < stats["cache_read_ratio"] < 1
+
+
+def test_usage_tracker_treats_missing_fields_as_zero():
+    class Usage:
+        input_tokens = 12
+        output_tokens = 3
+        cache_read_input_tokens = None
+
+    tracker = LLMUsageTracker()
+    counts = tracker.record(Usage())
+
+    assert counts == {
+        "input_tokens": 12,
+        "output_tokens": 3,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0
+    }
+    assert tracker.stats()["cache_read_ratio"] == 0.0